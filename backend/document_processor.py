@@ -12,14 +12,28 @@ It serves as the integration layer between components.
 
 import os
 import uuid
+import asyncio
+import hashlib
 import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from typing import List, Dict, Any, Optional, Tuple, Set
 from dataclasses import asdict
-import json
+import orjson
 import time
 
-from pdf_processing import PDFProcessor, TextChunk
-from embeddings import EmbeddingGenerator, get_embedding, get_embeddings_for_chunks
+from pdf_processing import PDFProcessor, TextChunk, _hash_pdf_file
+from embeddings import (
+    EmbeddingGenerator,
+    EMBED_CONCURRENCY,
+    get_embeddings_for_chunks,
+    get_query_embedding,
+)
+from query_cache import semantic_query_cache
+from query_handler import drop_cached_document
 from vector_store import VectorStore, initialize_vector_store, store_document_chunks
 
 # Configure logging
@@ -30,23 +44,129 @@ logger = logging.getLogger("document_processor")
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
 CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
 
+# On-disk store for document/session tracking, next to the embedding cache
+DB_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache")
+os.makedirs(DB_DIR, exist_ok=True)
+DOCUMENT_DB_PATH = os.getenv("DOCUMENT_DB_PATH", os.path.join(DB_DIR, "documents.db"))
+
+# In-process LRU of ingestion results keyed by SHA-256 of the PDF content,
+# so re-uploading the same file skips extraction, embedding and upserts
+INGEST_CACHE_SIZE = int(os.getenv("INGEST_CACHE_SIZE", "128"))
+_ingest_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+
+def _ingest_cache_get(digest: str) -> Optional[Dict[str, Any]]:
+    """Return a cached ingestion result and mark it most recently used."""
+    result = _ingest_cache.get(digest)
+    if result is not None:
+        _ingest_cache.move_to_end(digest)
+    return result
+
+
+def _ingest_cache_put(digest: str, result: Dict[str, Any]) -> None:
+    """Insert an ingestion result, evicting the least recently used entry."""
+    _ingest_cache[digest] = result
+    _ingest_cache.move_to_end(digest)
+    while len(_ingest_cache) > INGEST_CACHE_SIZE:
+        _ingest_cache.popitem(last=False)
+
+
+
 class DocumentProcessor:
     """
     Integration layer that connects PDF processing, embedding generation, and vector storage.
     Manages document tracking and session handling.
     """
     
-    def __init__(self):
+    def __init__(self, db_path: str = DOCUMENT_DB_PATH):
         """Initialize the document processor with component instances."""
         self.pdf_processor = PDFProcessor(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
         self.embedding_generator = EmbeddingGenerator()
         self.vector_store = initialize_vector_store()
-        
-        # Track documents and sessions
-        self.documents = {}  # Maps document_id to document metadata
-        self.sessions = {}   # Maps session_id to list of document_ids
+
+        # Track documents and sessions in SQLite so state survives restarts
+        # and is shared between workers. The connection is shared across
+        # request threads, so mutations are serialized behind a lock.
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self._db_lock = threading.RLock()
+        self._create_tables()
+
+    def _create_tables(self) -> None:
+        """Create the document/session tracking tables if they don't exist."""
+        with self._db_lock, self.db:
+            self.db.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    document_id TEXT PRIMARY KEY,
+                    filename TEXT,
+                    namespace TEXT,
+                    chunk_count INTEGER,
+                    stats_json TEXT,
+                    created_at REAL
+                )
+            """)
+            self.db.execute("""
+                CREATE TABLE IF NOT EXISTS session_docs (
+                    session_id TEXT,
+                    document_id TEXT,
+                    PRIMARY KEY (session_id, document_id)
+                )
+            """)
+            self.db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_session_docs_session "
+                "ON session_docs (session_id)"
+            )
+
+    @staticmethod
+    def _row_to_document(row: Tuple) -> Dict[str, Any]:
+        """Convert a documents table row into the document_info dict shape."""
+        return {
+            "document_id": row[0],
+            "filename": row[1],
+            "namespace": row[2],
+            "chunk_count": row[3],
+            "statistics": orjson.loads(row[4]) if row[4] else {},
+            "created_at": row[5]
+        }
+
+    def _fetch_document(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """Look up a document by ID, returning None if it isn't tracked."""
+        row = self.db.execute(
+            "SELECT document_id, filename, namespace, chunk_count, stats_json, created_at "
+            "FROM documents WHERE document_id = ?",
+            (document_id,)
+        ).fetchone()
+        return self._row_to_document(row) if row else None
     
-    def process_document(self, pdf_bytes: bytes, filename: str, 
+    def _cached_ingest(self, digest: str, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the prior ingestion result for identical PDF content, if any.
+
+        The cached document must still be tracked (it may have been deleted
+        since); on a valid hit the document is linked to the caller's session
+        and the original processing response is returned.
+        """
+        result = _ingest_cache_get(digest)
+        if result is None:
+            return None
+
+        document_id = result["document_id"]
+        if self._fetch_document(document_id) is None:
+            # Document was deleted after being cached — drop the stale entry
+            _ingest_cache.pop(digest, None)
+            return None
+
+        with self._db_lock, self.db:
+            self.db.execute(
+                "INSERT OR IGNORE INTO session_docs (session_id, document_id) VALUES (?, ?)",
+                (session_id, document_id)
+            )
+
+        logger.info("Reusing ingested document %s for identical upload", document_id)
+        return dict(result, session_id=session_id)
+
+    def process_document(self, pdf_bytes: bytes, filename: str,
                           session_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Process a document from PDF bytes: extract, chunk, embed, and store.
@@ -61,54 +181,247 @@ class DocumentProcessor:
         """
         # Generate document ID
         document_id = str(uuid.uuid4())
-        
+
         # Generate session ID if not provided
         if not session_id:
             session_id = str(uuid.uuid4())
-        
+
+        # Identical content short-circuits the whole pipeline
+        digest = hashlib.sha256(pdf_bytes).hexdigest()
+        cached = self._cached_ingest(digest, session_id)
+        if cached is not None:
+            return cached
+
         # 1. Process PDF and extract chunks
-        logger.info(f"Processing PDF: {filename}")
-        start_time = time.time()
+        logger.info("Processing PDF: %s", filename)
+        start_ns = time.perf_counter_ns()
         chunks = self.pdf_processor.process_pdf_bytes(
             pdf_bytes, 
             filename, 
             document_id=document_id
         )
-        logger.info(f"Extracted {len(chunks)} chunks in {time.time() - start_time:.2f}s")
+        logger.info("Extracted %d chunks in %.2fs", len(chunks),
+                    (time.perf_counter_ns() - start_ns) / 1e9)
         
         # 2. Generate embeddings for chunks
-        logger.info(f"Generating embeddings for {len(chunks)} chunks")
-        start_time = time.time()
+        logger.info("Generating embeddings for %d chunks", len(chunks))
+        start_ns = time.perf_counter_ns()
         chunk_embeddings = get_embeddings_for_chunks(chunks)
-        logger.info(f"Generated embeddings in {time.time() - start_time:.2f}s")
+        logger.info("Generated embeddings in %.2fs", (time.perf_counter_ns() - start_ns) / 1e9)
         
-        # 3. Store in vector database
-        logger.info(f"Storing vectors in Pinecone")
-        start_time = time.time()
+        # 3. Store in vector database, reusing the embeddings from step 2
+        logger.info("Storing vectors in Pinecone")
+        start_ns = time.perf_counter_ns()
         namespace = f"doc_{document_id}"
-        count = self.vector_store.upsert_chunks(chunks, namespace=namespace)
-        logger.info(f"Stored {count} vectors in {time.time() - start_time:.2f}s")
+        count = self.vector_store.upsert_chunks(
+            chunks, namespace=namespace, embeddings=chunk_embeddings
+        )
+        logger.info("Stored %d vectors in %.2fs", count,
+                    (time.perf_counter_ns() - start_ns) / 1e9)
         
-        # 4. Track the document
+        # 4. Track the document and build the response
+        result = self._register_document(document_id, session_id, filename, namespace, chunks)
+        _ingest_cache_put(digest, result)
+        return result
+
+    async def aprocess_document(self, pdf_bytes: bytes, filename: str,
+                                session_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Async variant of process_document that pipelines embedding and storage.
+
+        Embedding batches and Pinecone upserts run as a producer/consumer pair
+        connected by a queue, so each upsert overlaps with the next embedding
+        request instead of leaving the network idle between the two stages.
+
+        Args:
+            pdf_bytes: The PDF file as bytes
+            filename: The name of the file
+            session_id: Optional session identifier for tracking
+
+        Returns:
+            Dictionary with document details including document_id, statistics, etc.
+        """
+        document_id = str(uuid.uuid4())
+        if not session_id:
+            session_id = str(uuid.uuid4())
+
+        # Identical content short-circuits the whole pipeline
+        digest = hashlib.sha256(pdf_bytes).hexdigest()
+        cached = self._cached_ingest(digest, session_id)
+        if cached is not None:
+            return cached
+
+        # 1. Process PDF and extract chunks in a worker thread — extraction
+        # and chunking are CPU-bound and would otherwise stall the event loop
+        logger.info("Processing PDF: %s", filename)
+        start_ns = time.perf_counter_ns()
+        chunks = await asyncio.to_thread(
+            self.pdf_processor.process_pdf_bytes,
+            pdf_bytes,
+            filename,
+            document_id=document_id
+        )
+        logger.info("Extracted %d chunks in %.2fs", len(chunks),
+                    (time.perf_counter_ns() - start_ns) / 1e9)
+
+        # 2-4. Embed, store and track
+        result = await self._ingest_chunks(document_id, session_id, filename, chunks)
+        _ingest_cache_put(digest, result)
+        return result
+
+    async def aprocess_document_path(self, pdf_path: str, filename: str,
+                                     session_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Pipelined processing of a PDF already on disk.
+
+        PyMuPDF streams pages straight from the file, so the whole PDF is
+        never held in memory as a bytes object — /upload spools the request
+        body to a temp file and hands the path here.
+
+        Args:
+            pdf_path: Path to the PDF file on disk
+            filename: Original filename for display/tracking
+            session_id: Optional session identifier for tracking
+
+        Returns:
+            Dictionary with document details including document_id, statistics, etc.
+        """
+        document_id = str(uuid.uuid4())
+        if not session_id:
+            session_id = str(uuid.uuid4())
+
+        # Identical content short-circuits the whole pipeline; hashing reads
+        # the spooled file in blocks off the event loop
+        digest = await asyncio.to_thread(_hash_pdf_file, pdf_path)
+        cached = self._cached_ingest(digest, session_id)
+        if cached is not None:
+            return cached
+
+        # 1. Process PDF from disk and extract chunks in a worker thread —
+        # extraction and chunking are CPU-bound and would otherwise stall
+        # the event loop
+        logger.info("Processing PDF: %s", filename)
+        start_ns = time.perf_counter_ns()
+        chunks = await asyncio.to_thread(
+            self.pdf_processor.process_pdf,
+            pdf_path,
+            document_id=document_id,
+            document_name=filename
+        )
+        logger.info("Extracted %d chunks in %.2fs", len(chunks),
+                    (time.perf_counter_ns() - start_ns) / 1e9)
+
+        # 2-4. Embed, store and track
+        result = await self._ingest_chunks(document_id, session_id, filename, chunks)
+        _ingest_cache_put(digest, result)
+        return result
+
+    async def _ingest_chunks(self, document_id: str, session_id: str, filename: str,
+                             chunks: List[TextChunk]) -> Dict[str, Any]:
+        """Embed and store extracted chunks, then record tracking state."""
+        namespace = f"doc_{document_id}"
+        start_ns = time.perf_counter_ns()
+        count = await self._embed_and_store(chunks, namespace)
+        logger.info("Embedded and stored %d vectors in %.2fs", count,
+                    (time.perf_counter_ns() - start_ns) / 1e9)
+
+        return self._register_document(document_id, session_id, filename, namespace, chunks)
+
+    async def _embed_and_store(self, chunks: List[TextChunk], namespace: str) -> int:
+        """
+        Pipeline embedding generation and Pinecone upserts over a queue.
+
+        The producer embeds up to EMBED_CONCURRENCY batches at a time and
+        enqueues each as it completes; the consumer upserts finished batches
+        in a worker thread while further embedding requests stay in flight.
+
+        Args:
+            chunks: Chunks to embed and store
+            namespace: Pinecone namespace to upsert into
+
+        Returns:
+            Number of vectors upserted
+        """
+        if not chunks:
+            return 0
+
+        batch_size = self.embedding_generator.batch_size
+        queue: asyncio.Queue = asyncio.Queue(maxsize=4)
+
+        async def producer():
+            # Each batch embeds as its own task so up to EMBED_CONCURRENCY
+            # API requests are genuinely in flight at once; awaiting the
+            # batches one at a time left the fan-out with a single permit
+            # in use. Batches go on the queue as they complete — upsert
+            # order doesn't matter — and the semaphore is held through the
+            # enqueue so finished batches can't pile up past the queue's
+            # backpressure.
+            semaphore = asyncio.Semaphore(EMBED_CONCURRENCY)
+
+            async def embed_batch(batch: List[TextChunk]) -> None:
+                async with semaphore:
+                    embeddings = await self.embedding_generator.aget_embeddings_batch(
+                        [chunk.text for chunk in batch]
+                    )
+                    chunk_embeddings = dict(zip((chunk.chunk_id for chunk in batch), embeddings))
+                    await queue.put((batch, chunk_embeddings))
+
+            await asyncio.gather(*(
+                embed_batch(chunks[i:i+batch_size])
+                for i in range(0, len(chunks), batch_size)
+            ))
+            await queue.put(None)  # Sentinel: no more batches
+
+        async def consumer():
+            total = 0
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                batch, chunk_embeddings = item
+                vectors = self.vector_store.prepare_vectors(batch, chunk_embeddings)
+                # The blocking Pinecone client runs in a worker thread so the
+                # event loop can keep driving the producer
+                total += await asyncio.to_thread(
+                    self.vector_store.upsert_vectors, vectors, namespace
+                )
+            return total
+
+        # Join the pipeline as tasks so a failure on one side can cancel
+        # the other: with a bare gather, a producer error left the
+        # consumer pending on queue.get() forever, and a consumer error
+        # left the producer blocked on queue.put() against the bounded
+        # queue.
+        producer_task = asyncio.create_task(producer())
+        consumer_task = asyncio.create_task(consumer())
+        try:
+            _, count = await asyncio.gather(producer_task, consumer_task)
+        except BaseException:
+            producer_task.cancel()
+            consumer_task.cancel()
+            await asyncio.gather(producer_task, consumer_task, return_exceptions=True)
+            raise
+        return count
+
+    def _register_document(self, document_id: str, session_id: str, filename: str,
+                           namespace: str, chunks: List[TextChunk]) -> Dict[str, Any]:
+        """Record document/session tracking state and build the processing response."""
         stats = self.pdf_processor.get_document_statistics(chunks)
-        
-        document_info = {
-            "document_id": document_id,
-            "filename": filename,
-            "namespace": namespace,
-            "chunk_count": len(chunks),
-            "statistics": stats,
-            "created_at": time.time()
-        }
-        
-        # Store document info
-        self.documents[document_id] = document_info
-        
-        # Add to session tracking
-        if session_id not in self.sessions:
-            self.sessions[session_id] = []
-        self.sessions[session_id].append(document_id)
-        
+
+        # Store document info and session membership
+        with self._db_lock, self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO documents "
+                "(document_id, filename, namespace, chunk_count, stats_json, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (document_id, filename, namespace, len(chunks),
+                 orjson.dumps(stats), time.time())
+            )
+            self.db.execute(
+                "INSERT OR IGNORE INTO session_docs (session_id, document_id) VALUES (?, ?)",
+                (session_id, document_id)
+            )
+
         # Return document details
         result = {
             "document_id": document_id,
@@ -120,9 +433,10 @@ class DocumentProcessor:
                 {
                     "chunk_id": chunk.chunk_id,
                     "page": chunk.page_number + 1,  # Convert to 1-indexed for display
-                    "text_preview": chunk.text[:100] + "..." if len(chunk.text) > 100 else chunk.text
+                    "text_preview": (chunk.text[:100] + "...") if len(chunk.text) > 100 else chunk.text
                 }
-                for chunk in chunks[:3]  # Show first 3 chunks as samples
+                # islice avoids copying the chunk list just to show 3 samples
+                for chunk in islice(chunks, 3)
             ]
         }
         
@@ -141,19 +455,19 @@ class DocumentProcessor:
             Dictionary with query results
         """
         # Check if document exists
-        if document_id not in self.documents:
+        document_info = self._fetch_document(document_id)
+        if document_info is None:
             raise ValueError(f"Document not found: {document_id}")
-            
-        document_info = self.documents[document_id]
+
         namespace = document_info.get("namespace") or f"doc_{document_id}"
         
         # Generate embedding for query
-        query_embedding = get_embedding(query)
+        query_embedding = get_query_embedding(query)
         
         # Search vector store
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         results = self.vector_store.query(query, namespace=namespace, top_k=top_k)
-        query_time = time.time() - start_time
+        query_time = (time.perf_counter_ns() - start_ns) / 1e9
         
         return {
             "document_id": document_id,
@@ -174,10 +488,11 @@ class DocumentProcessor:
         Returns:
             Dictionary with document metadata
         """
-        if document_id not in self.documents:
+        document_info = self._fetch_document(document_id)
+        if document_info is None:
             raise ValueError(f"Document not found: {document_id}")
-            
-        return self.documents[document_id]
+
+        return document_info
     
     def get_session_documents(self, session_id: str) -> List[Dict[str, Any]]:
         """
@@ -189,14 +504,16 @@ class DocumentProcessor:
         Returns:
             List of document metadata dictionaries
         """
-        if session_id not in self.sessions:
-            return []
-            
-        return [
-            self.documents[doc_id] 
-            for doc_id in self.sessions[session_id]
-            if doc_id in self.documents
-        ]
+        rows = self.db.execute(
+            "SELECT d.document_id, d.filename, d.namespace, d.chunk_count, "
+            "d.stats_json, d.created_at "
+            "FROM documents d "
+            "JOIN session_docs s ON s.document_id = d.document_id "
+            "WHERE s.session_id = ? "
+            "ORDER BY d.created_at",
+            (session_id,)
+        ).fetchall()
+        return [self._row_to_document(row) for row in rows]
     
     def delete_document(self, document_id: str) -> bool:
         """
@@ -208,23 +525,24 @@ class DocumentProcessor:
         Returns:
             True if successful
         """
-        if document_id not in self.documents:
+        document_info = self._fetch_document(document_id)
+        if document_info is None:
             raise ValueError(f"Document not found: {document_id}")
-            
-        document_info = self.documents[document_id]
+
         namespace = document_info.get("namespace") or f"doc_{document_id}"
-        
+
         # Delete vectors from store
         self.vector_store.delete_vectors(delete_all=True, namespace=namespace)
-        
-        # Remove from document tracking
-        del self.documents[document_id]
-        
-        # Remove from all sessions
-        for session_id, doc_ids in self.sessions.items():
-            if document_id in doc_ids:
-                self.sessions[session_id].remove(document_id)
-        
+
+        # Remove from document tracking and all sessions
+        with self._db_lock, self.db:
+            self.db.execute("DELETE FROM documents WHERE document_id = ?", (document_id,))
+            self.db.execute("DELETE FROM session_docs WHERE document_id = ?", (document_id,))
+
+        # Cached answers for this document are no longer valid
+        semantic_query_cache.drop(document_id)
+        drop_cached_document(document_id)
+
         return True
     
     def clear_session(self, session_id: str) -> int:
@@ -237,23 +555,46 @@ class DocumentProcessor:
         Returns:
             Number of documents deleted
         """
-        if session_id not in self.sessions:
-            return 0
-            
-        document_ids = list(self.sessions[session_id])
-        count = 0
-        
-        for document_id in document_ids:
-            try:
-                self.delete_document(document_id)
-                count += 1
-            except Exception as e:
-                logger.error(f"Error deleting document {document_id}: {str(e)}")
-        
-        # Clear session tracking
-        self.sessions[session_id] = []
-        
-        return count
+        rows = self.db.execute(
+            "SELECT d.document_id, d.namespace FROM documents d "
+            "JOIN session_docs s ON s.document_id = d.document_id "
+            "WHERE s.session_id = ?",
+            (session_id,)
+        ).fetchall()
+
+        # Namespace deletes are independent HTTPS round-trips, so fan them out
+        deleted_ids = []
+        if rows:
+            with ThreadPoolExecutor(max_workers=16) as executor:
+                futures = {
+                    executor.submit(
+                        self.vector_store.delete_vectors,
+                        delete_all=True,
+                        namespace=namespace or f"doc_{document_id}"
+                    ): document_id
+                    for document_id, namespace in rows
+                }
+                for future, document_id in futures.items():
+                    try:
+                        future.result()
+                        deleted_ids.append(document_id)
+                    except Exception as e:
+                        logger.error(f"Error deleting document {document_id}: {str(e)}")
+
+        # Cached answers for the deleted documents are no longer valid
+        for document_id in deleted_ids:
+            semantic_query_cache.drop(document_id)
+            drop_cached_document(document_id)
+
+        # Bookkeeping runs once for all successful deletes
+        with self._db_lock, self.db:
+            self.db.executemany(
+                "DELETE FROM documents WHERE document_id = ?",
+                [(document_id,) for document_id in deleted_ids]
+            )
+            self.db.execute("DELETE FROM session_docs WHERE session_id = ?", (session_id,))
+
+        return len(deleted_ids)
 
 # Create a singleton instance
 document_processor = DocumentProcessor()
@@ -273,6 +614,34 @@ def process_document(pdf_bytes: bytes, filename: str, session_id: Optional[str]
     """
     return document_processor.process_document(pdf_bytes, filename, session_id)
 
+async def aprocess_document(pdf_bytes: bytes, filename: str, session_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Process a document using the singleton document processor's pipelined path.
+
+    Args:
+        pdf_bytes: PDF content as bytes
+        filename: Original filename
+        session_id: Optional session identifier
+
+    Returns:
+        Document processing results
+    """
+    return await document_processor.aprocess_document(pdf_bytes, filename, session_id)
+
+async def aprocess_document_path(pdf_path: str, filename: str, session_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Process a PDF already on disk using the singleton document processor.
+
+    Args:
+        pdf_path: Path to the PDF file on disk
+        filename: Original filename
+        session_id: Optional session identifier
+
+    Returns:
+        Document processing results
+    """
+    return await document_processor.aprocess_document_path(pdf_path, filename, session_id)
+
 def query_document(query: str, document_id: str, top_k: int = 5) -> Dict[str, Any]:
     """
     Query a document using the singleton document processor.
@@ -1,9 +1,9 @@
 # Functions to call OpenAI API for generating embeddings
 import os
-import time
+import asyncio
 import logging
-import hashlib
-import json
+from collections import OrderedDict
+from functools import lru_cache
 from typing import List, Dict, Any, Optional, Union, Tuple
 from dataclasses import asdict
 import numpy as np
@@ -11,7 +11,8 @@ from diskcache import Cache
 from tqdm import tqdm
 import backoff
 import openai
-from openai import OpenAI
+import xxhash
+from openai import OpenAI, AsyncOpenAI
 from dotenv import load_dotenv
 
 from pdf_processing import TextChunk
@@ -31,6 +32,97 @@ embedding_cache = Cache(os.path.join(CACHE_DIR, "embeddings_cache"))
 # Default model for embeddings
 DEFAULT_EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL_NAME", "text-embedding-3-small")
 
+# Maximum number of embedding batch requests in flight at once
+EMBED_CONCURRENCY = int(os.environ.get("EMBED_CONCURRENCY", "8"))
+
+# Embedding dimensions by model; avoids inferring the dimension by substring
+MODEL_DIMENSIONS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+DEFAULT_DIMENSIONS = 1536
+
+
+def _model_dim(model: str) -> int:
+    """Return the embedding dimension for a model."""
+    return MODEL_DIMENSIONS.get(model, DEFAULT_DIMENSIONS)
+
+# Components of the cache-key fingerprint. Bump CACHE_SCHEMA_VERSION whenever
+# preprocessing or the stored value format changes; old entries then simply
+# stop matching instead of returning stale vectors.
+TOKENIZER_VERSION = os.environ.get("EMBEDDING_TOKENIZER_VERSION", "cl100k_base")
+CACHE_SCHEMA_VERSION = "v1"
+_FINGERPRINT_META_KEY = "__embedding_cache_fingerprint__"
+
+
+@lru_cache(maxsize=None)
+def _cache_fingerprint(model: str) -> str:
+    """
+    Build the composite fingerprint that namespaces cache keys.
+
+    Keys carry model, embedding dimension, tokenizer and schema version, so a
+    change in any of them makes old entries miss rather than serve wrong
+    vectors, and the cache can safely be kept across upgrades.
+    """
+    return f"{model}|{_model_dim(model)}|{TOKENIZER_VERSION}|{CACHE_SCHEMA_VERSION}"
+
+
+@lru_cache(maxsize=None)
+def _ensure_cache_fingerprint() -> None:
+    """
+    Record the fingerprint components for the default model on first cache
+    use; a mismatch on a later run is informational only — the new
+    fingerprint keys form their own namespace and old entries are never
+    returned. Deferred to first use (and memoized) so merely importing this
+    module never writes to the cache database.
+    """
+    fingerprint = _cache_fingerprint(DEFAULT_EMBEDDING_MODEL)
+    stored_fingerprint = embedding_cache.get(_FINGERPRINT_META_KEY)
+    if stored_fingerprint is None:
+        embedding_cache[_FINGERPRINT_META_KEY] = fingerprint
+    elif stored_fingerprint != fingerprint:
+        logger.info(
+            f"Embedding cache fingerprint changed from {stored_fingerprint} to "
+            f"{fingerprint}; old entries will be ignored"
+        )
+        embedding_cache[_FINGERPRINT_META_KEY] = fingerprint
+
+
+# In-process LRU layer in front of the disk cache: hot keys (repeated queries,
+# duplicate chunks) skip the diskcache syscall/deserialize entirely
+EMBED_MEMCACHE_SIZE = int(os.environ.get("EMBED_MEMCACHE_SIZE", "4096"))
+_embedding_memcache: "OrderedDict[str, List[float]]" = OrderedDict()
+
+
+def _memcache_get(cache_key: str) -> Optional[List[float]]:
+    """Probe the in-memory tier, refreshing recency on a hit."""
+    embedding = _embedding_memcache.get(cache_key)
+    if embedding is not None:
+        _embedding_memcache.move_to_end(cache_key)
+    return embedding
+
+
+def _memcache_put(cache_key: str, embedding: List[float]) -> None:
+    """Store an embedding in the in-memory tier, evicting the LRU entry on overflow."""
+    _embedding_memcache[cache_key] = embedding
+    _embedding_memcache.move_to_end(cache_key)
+    if len(_embedding_memcache) > EMBED_MEMCACHE_SIZE:
+        _embedding_memcache.popitem(last=False)
+
+
+def _encode_embedding(embedding: List[float]) -> bytes:
+    """Pack an embedding into raw float32 bytes for compact cache storage."""
+    return np.asarray(embedding, dtype=np.float32).tobytes()
+
+
+def _decode_embedding(cached: Union[bytes, List[float]]) -> List[float]:
+    """Unpack a cached embedding back into a list of floats."""
+    if isinstance(cached, bytes):
+        return np.frombuffer(cached, dtype=np.float32).tolist()
+    # Entries written before the float32 format were plain lists
+    return cached
+
 class EmbeddingGenerator:
     """Class to handle generation of embeddings using OpenAI API with caching and retry logic."""
     
@@ -55,6 +147,7 @@ class EmbeddingGenerator:
             raise ValueError("OpenAI API key is required. Please provide it as an argument or set the OPENAI_API_KEY environment variable.")
         
         self.client = OpenAI(api_key=self.api_key)
+        self.async_client = AsyncOpenAI(api_key=self.api_key)
         self.model = model
         self.batch_size = batch_size
         self.max_retries = max_retries
@@ -62,10 +155,36 @@ class EmbeddingGenerator:
         logger.info(f"Initialized EmbeddingGenerator with model {model} and batch size {batch_size}")
     
     def _get_cache_key(self, text: str, model: str) -> str:
-        """Generate a cache key for a text and model."""
-        text_hash = hashlib.md5(text.encode()).hexdigest()
-        return f"{model}_{text_hash}"
+        """Generate a fingerprinted cache key for a text and model."""
+        _ensure_cache_fingerprint()
+        # xxh3 is much faster than cryptographic hashes on bulk text, and the
+        # integer digest skips the intermediate hex-string allocation
+        return f"{_cache_fingerprint(model)}_{xxhash.xxh3_128_intdigest(text.encode('utf-8', 'ignore')):032x}"
     
+    @backoff.on_exception(
+        backoff.expo,
+        (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError),
+        max_tries=5,
+        factor=2
+    )
+    def _get_embeddings_batch_api(self, texts: List[str], model: str) -> List[List[float]]:
+        """
+        Get embeddings for multiple texts in a single API request with backoff retry logic.
+
+        Args:
+            texts: The texts to embed (must all be non-empty)
+            model: The model to use
+
+        Returns:
+            List of embeddings in the same order as the input texts
+        """
+        response = self.client.embeddings.create(
+            model=model,
+            input=texts
+        )
+        # The API returns embeddings with an index field; sort to guarantee input order
+        return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
     @backoff.on_exception(
         backoff.expo,
         (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError),
@@ -85,10 +204,8 @@ class EmbeddingGenerator:
         """
         if not text.strip():
             logger.warning("Received empty text for embedding, returning zero vector")
-            # Return a zero vector of appropriate dimension
-            # Dimensions depend on the model: text-embedding-3-small = 1536, text-embedding-3-large = 3072
-            dim = 1536 if "small" in model else 3072
-            return [0.0] * dim
+            # Return a zero vector of the model's dimension
+            return [0.0] * _model_dim(model)
         
         response = self.client.embeddings.create(
             model=model,
@@ -109,21 +226,27 @@ class EmbeddingGenerator:
         """
         model = model or self.model
         
-        # Check cache if enabled
+        # Check the memory tier, then the disk tier
         if self.use_cache:
             cache_key = self._get_cache_key(text, model)
-            cached_embedding = embedding_cache.get(cache_key)
+            cached_embedding = _memcache_get(cache_key)
             if cached_embedding is not None:
                 return cached_embedding
-        
+            cached_embedding = embedding_cache.get(cache_key)
+            if cached_embedding is not None:
+                embedding = _decode_embedding(cached_embedding)
+                _memcache_put(cache_key, embedding)
+                return embedding
+
         # Generate embedding
         embedding = self._get_embedding_single(text, model)
-        
-        # Cache the result if caching is enabled
+
+        # Cache the result in both tiers if caching is enabled
         if self.use_cache:
             cache_key = self._get_cache_key(text, model)
-            embedding_cache[cache_key] = embedding
-            
+            embedding_cache[cache_key] = _encode_embedding(embedding)
+            _memcache_put(cache_key, embedding)
+
         return embedding
     
     def get_embeddings_batch(self, texts: List[str], model: Optional[str] = None) -> List[List[float]]:
@@ -139,36 +262,127 @@ class EmbeddingGenerator:
         """
         model = model or self.model
         embeddings = []
-        
-        # Process in batches
+
+        # Process in batches, each batch as a single API request
         for i in tqdm(range(0, len(texts), self.batch_size), desc="Generating embeddings"):
             batch_texts = texts[i:i+self.batch_size]
-            batch_embeddings = []
-            
-            # Check cache for each text in the batch
-            for text in batch_texts:
-                if self.use_cache:
-                    cache_key = self._get_cache_key(text, model)
-                    cached_embedding = embedding_cache.get(cache_key)
-                    if cached_embedding is not None:
-                        batch_embeddings.append(cached_embedding)
-                        continue
-                
-                # Generate embedding for texts not in cache
-                embedding = self._get_embedding_single(text, model)
-                batch_embeddings.append(embedding)
-                
-                # Cache the result
-                if self.use_cache:
-                    cache_key = self._get_cache_key(text, model)
-                    embedding_cache[cache_key] = embedding
-            
+            batch_embeddings, miss_indices, miss_texts, miss_keys = \
+                self._partition_batch(batch_texts, model)
+
+            # Embed all cache misses in one API call and scatter back in order
+            if miss_texts:
+                miss_embeddings = self._get_embeddings_batch_api(miss_texts, model)
+                self._resolve_misses(batch_embeddings, miss_indices, miss_keys, miss_embeddings)
+
+            embeddings.extend(batch_embeddings)
+
+        return embeddings
+
+    def _partition_batch(self, batch_texts: List[str],
+                         model: str) -> Tuple[List[Optional[List[float]]], List[int], List[str], List[str]]:
+        """
+        Split a batch into already-resolved slots (cache hits, empty texts) and API misses.
+
+        Args:
+            batch_texts: The texts in this batch
+            model: The model to use
+
+        Returns:
+            Tuple of (partially filled embeddings list, miss indices, miss texts, miss cache keys)
+        """
+        batch_embeddings: List[Optional[List[float]]] = [None] * len(batch_texts)
+        miss_indices = []
+        miss_texts = []
+        miss_keys = []
+
+        for j, text in enumerate(batch_texts):
+            # Empty texts never reach the API; fill their slots with a zero vector
+            if not text.strip():
+                batch_embeddings[j] = [0.0] * _model_dim(model)
+                continue
+            if self.use_cache:
+                cache_key = self._get_cache_key(text, model)
+                cached_embedding = _memcache_get(cache_key)
+                if cached_embedding is not None:
+                    batch_embeddings[j] = cached_embedding
+                    continue
+                cached_embedding = embedding_cache.get(cache_key)
+                if cached_embedding is not None:
+                    embedding = _decode_embedding(cached_embedding)
+                    _memcache_put(cache_key, embedding)
+                    batch_embeddings[j] = embedding
+                    continue
+                miss_keys.append(cache_key)
+            miss_indices.append(j)
+            miss_texts.append(text)
+
+        return batch_embeddings, miss_indices, miss_texts, miss_keys
+
+    def _resolve_misses(self, batch_embeddings: List[Optional[List[float]]],
+                        miss_indices: List[int], miss_keys: List[str],
+                        miss_embeddings: List[List[float]]) -> None:
+        """Scatter freshly generated embeddings into their slots and bulk-write the cache."""
+        for j, embedding in zip(miss_indices, miss_embeddings):
+            batch_embeddings[j] = embedding
+
+        # Bulk-write the new embeddings to both cache tiers
+        if self.use_cache:
+            with embedding_cache.transact():
+                for cache_key, embedding in zip(miss_keys, miss_embeddings):
+                    embedding_cache[cache_key] = _encode_embedding(embedding)
+                    _memcache_put(cache_key, embedding)
+
+    @backoff.on_exception(
+        backoff.expo,
+        (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError),
+        max_tries=5,
+        factor=2
+    )
+    async def _aget_embeddings_batch_api(self, texts: List[str], model: str) -> List[List[float]]:
+        """Async variant of _get_embeddings_batch_api using the AsyncOpenAI client."""
+        response = await self.async_client.embeddings.create(
+            model=model,
+            input=texts
+        )
+        return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+    async def aget_embeddings_batch(self, texts: List[str],
+                                    model: Optional[str] = None) -> List[List[float]]:
+        """
+        Get embeddings for a list of texts with batch requests issued concurrently.
+
+        Up to EMBED_CONCURRENCY batch requests are kept in flight at once, so a
+        large ingest costs roughly ceil(batches / concurrency) round-trips of
+        wall time instead of one round-trip per batch.
+
+        Args:
+            texts: List of texts to embed
+            model: The model to use (defaults to self.model)
+
+        Returns:
+            List of embeddings (each embedding is a list of floats)
+        """
+        model = model or self.model
+        semaphore = asyncio.Semaphore(EMBED_CONCURRENCY)
+
+        async def embed_batch(batch_texts: List[str]) -> List[List[float]]:
+            batch_embeddings, miss_indices, miss_texts, miss_keys = \
+                self._partition_batch(batch_texts, model)
+            if miss_texts:
+                async with semaphore:
+                    miss_embeddings = await self._aget_embeddings_batch_api(miss_texts, model)
+                self._resolve_misses(batch_embeddings, miss_indices, miss_keys, miss_embeddings)
+            return batch_embeddings
+
+        tasks = [
+            embed_batch(texts[i:i+self.batch_size])
+            for i in range(0, len(texts), self.batch_size)
+        ]
+        results = await asyncio.gather(*tasks)
+
+        embeddings = []
+        for batch_embeddings in results:
             embeddings.extend(batch_embeddings)
-            
-            # Add a small delay to avoid hitting rate limits
-            if i + self.batch_size < len(texts):
-                time.sleep(0.1)
-                
         return embeddings
     
     def get_embeddings_for_chunks(self, chunks: List[TextChunk], model: Optional[str] = None) -> Dict[str, List[float]]:
@@ -183,52 +397,97 @@ class EmbeddingGenerator:
             Dictionary mapping chunk_id to embedding
         """
         model = model or self.model
-        texts = [chunk.text for chunk in chunks]
-        chunk_ids = [chunk.chunk_id for chunk in chunks]
-        
-        embeddings = self.get_embeddings_batch(texts, model)
-        
-        return dict(zip(chunk_ids, embeddings))
+
+        # Deduplicate identical texts (page headers/footers, boilerplate) so
+        # each distinct text is embedded exactly once
+        unique_indices: Dict[str, List[int]] = {}
+        for i, chunk in enumerate(chunks):
+            unique_indices.setdefault(chunk.text, []).append(i)
+
+        unique_embeddings = self.get_embeddings_batch(list(unique_indices), model)
+
+        # Scatter each unique embedding back to every chunk that shares the text
+        embeddings: List[Optional[List[float]]] = [None] * len(chunks)
+        for embedding, indices in zip(unique_embeddings, unique_indices.values()):
+            for i in indices:
+                embeddings[i] = embedding
+
+        return {chunk.chunk_id: embedding for chunk, embedding in zip(chunks, embeddings)}
+
+# Lazily constructed generator shared by the module-level utility functions,
+# so repeated calls reuse one OpenAI client (and its connection pool) instead
+# of paying a fresh TLS handshake per call
+_default_generator: Optional[EmbeddingGenerator] = None
+
+def _get_default_generator(model: str) -> EmbeddingGenerator:
+    """Return the shared EmbeddingGenerator, rebuilding it only on model change."""
+    global _default_generator
+    if _default_generator is None or _default_generator.model != model:
+        _default_generator = EmbeddingGenerator(model=model)
+    return _default_generator
 
 # Utility functions for easy access
 def get_embedding(text: str, model: str = DEFAULT_EMBEDDING_MODEL) -> List[float]:
     """
     Utility function to get embedding for a single text.
-    
+
     Args:
         text: The text to embed
         model: The model to use
-        
+
+    Returns:
+        The embedding as a list of floats
+    """
+    return _get_default_generator(model).get_embedding(text, model)
+
+# Bump to invalidate previously cached query embeddings (e.g. on model change)
+QUERY_EMBED_VERSION = 1
+
+@lru_cache(maxsize=1024)
+def _cached_query_embedding(model: str, text: str, version: int) -> Tuple[float, ...]:
+    """LRU-cached query embedding, stored as a tuple so entries are immutable."""
+    return tuple(_get_default_generator(model).get_embedding(text, model))
+
+def get_query_embedding(text: str, model: str = DEFAULT_EMBEDDING_MODEL) -> List[float]:
+    """
+    Get an embedding for a user query, memoized in-process.
+
+    Queries repeat heavily (page reloads, re-asked questions), so a small LRU
+    keyed on (model, query) removes the embedding round-trip for repeats.
+
+    Args:
+        text: The query text to embed
+        model: The model to use
+
     Returns:
         The embedding as a list of floats
     """
-    generator = EmbeddingGenerator(model=model)
-    return generator.get_embedding(text, model)
+    # Collapse whitespace in the cache key so trivial retypes of the same
+    # question ("what is x " vs "what is x") share an entry
+    return list(_cached_query_embedding(model, " ".join(text.split()), QUERY_EMBED_VERSION))
 
 def get_embeddings_batch(texts: List[str], model: str = DEFAULT_EMBEDDING_MODEL) -> List[List[float]]:
     """
     Utility function to get embeddings for a batch of texts.
-    
+
     Args:
         texts: List of texts to embed
         model: The model to use
-        
+
     Returns:
         List of embeddings
     """
-    generator = EmbeddingGenerator(model=model)
-    return generator.get_embeddings_batch(texts, model)
+    return _get_default_generator(model).get_embeddings_batch(texts, model)
 
 def get_embeddings_for_chunks(chunks: List[TextChunk], model: str = DEFAULT_EMBEDDING_MODEL) -> Dict[str, List[float]]:
     """
     Utility function to get embeddings for TextChunk objects.
-    
+
     Args:
         chunks: List of TextChunk objects
         model: The model to use
-        
+
     Returns:
         Dictionary mapping chunk_id to embedding
     """
-    generator = EmbeddingGenerator(model=model)
-    return generator.get_embeddings_for_chunks(chunks, model)
+    return _get_default_generator(model).get_embeddings_for_chunks(chunks, model)
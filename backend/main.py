@@ -1,7 +1,10 @@
 import os
+import shutil
 from dotenv import load_dotenv
 from fastapi import FastAPI, UploadFile, File, HTTPException, Body
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 import uvicorn
 from typing import Dict, Any, List, Optional
 import json
@@ -12,9 +15,8 @@ from pydantic import BaseModel
 
 # Import our modules
 from pdf_processing import process_pdf_bytes, PDFProcessor
-from document_processor import document_processor, process_document
-from query_handler import process_query
-from response_generator import generate_response, response_generator
+from document_processor import document_processor, aprocess_document, aprocess_document_path
+from query_handler import process_query, aprocess_query, astream_query
 
 # Load environment variables
 load_dotenv()
@@ -27,7 +29,8 @@ logger = logging.getLogger("main")
 app = FastAPI(
     title="Researcher Agent Chat App",
     description="A FastAPI application for research agent chat",
-    version="0.1.0"
+    version="0.1.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -39,6 +42,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Uploads up to this size are processed straight from memory; anything
+# larger spools to a temp file and PyMuPDF streams pages from disk
+UPLOAD_SPOOL_MAX_BYTES = int(os.getenv("UPLOAD_SPOOL_MAX_BYTES", str(10 * 1024 * 1024)))
+
 # Add this model definition before your endpoint
 class QueryRequest(BaseModel):
     """Request model for document queries"""
@@ -67,14 +74,30 @@ async def upload_file(file: UploadFile = File(...), session_id: Optional[str] =
         raise HTTPException(status_code=400, detail="Only PDF files are supported")
     
     try:
-        # Read the uploaded file content
-        pdf_content = await file.read()
-        
-        # Process the document (extract, chunk, embed, store)
-        result = process_document(pdf_content, file.filename, session_id)
-        
-        return result
-    
+        # Read up to the spool threshold first; small PDFs (the common case)
+        # are processed straight from memory with no disk round-trip
+        head = await run_in_threadpool(file.file.read, UPLOAD_SPOOL_MAX_BYTES + 1)
+        if len(head) <= UPLOAD_SPOOL_MAX_BYTES:
+            return await aprocess_document(head, file.filename, session_id)
+
+        # Larger uploads spool to disk so the whole PDF is never held in
+        # memory as a bytes object; PyMuPDF then streams pages from the file
+        tmp = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+        try:
+            tmp.write(head)
+            del head
+            # The copy is blocking disk I/O, so it runs in the thread pool
+            # rather than on the event loop
+            await run_in_threadpool(shutil.copyfileobj, file.file, tmp, 1024 * 1024)
+            tmp.close()
+
+            # Process the document (extract, chunk, embed, store) with the
+            # embedding/upsert stages pipelined
+            return await aprocess_document_path(tmp.name, file.filename, session_id)
+        finally:
+            tmp.close()
+            os.unlink(tmp.name)
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
 
@@ -84,8 +107,9 @@ async def query_document(query_request: QueryRequest):
     Process a query against a document and return results.
     """
     try:
-        # Process the query
-        results = process_query(
+        # The async pipeline keeps the event loop free and runs the vector
+        # searches for all query variants concurrently
+        results = await aprocess_query(
             query_text=query_request.query,
             document_id=query_request.document_id,
             top_k=query_request.top_k
@@ -114,6 +138,29 @@ async def query_document(query_request: QueryRequest):
             "error": str(e)
         }
 
+@app.post("/query/stream")
+async def query_document_stream(query_request: QueryRequest):
+    """
+    Process a query and stream the answer as newline-delimited JSON.
+
+    Each line is {"type": "delta", "text": ...} while the answer is being
+    generated, followed by a final {"type": "response", "data": ...} line
+    with the full result, so clients can render tokens as they arrive.
+    """
+    async def event_stream():
+        try:
+            async for event in astream_query(
+                query_text=query_request.query,
+                document_id=query_request.document_id,
+                top_k=query_request.top_k
+            ):
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            logger.error(f"Error streaming query: {str(e)}")
+            yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
 @app.get("/documents/{session_id}")
 async def get_session_documents(session_id: str):
     """
@@ -183,4 +230,11 @@ async def clear_session(session_id: str):
         raise HTTPException(status_code=500, detail=f"Error clearing session: {str(e)}")
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=int(os.getenv("PORT", "8000")), reload=True) 
\ No newline at end of file
+    # Auto-reload spawns a watcher plus a worker process (double import of
+    # PyMuPDF, the embedding client and the vector store), so it is opt-in
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=int(os.getenv("PORT", "8000")),
+        reload=os.getenv("RELOAD", "").lower() in ("1", "true", "yes")
+    )
\ No newline at end of file
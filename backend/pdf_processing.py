@@ -8,16 +8,139 @@ This module handles:
 """
 
 import os
+import sys
 import fitz  # PyMuPDF
+import hashlib
+import threading
 import uuid
-from typing import List, Dict, Any, Tuple, Optional
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import List, Dict, Any, Callable, Iterator, Tuple, Optional
 from dataclasses import dataclass
 import re
+from diskcache import Cache
 
+# Bounded worker count for parallel page extraction
+EXTRACT_WORKERS = min(8, os.cpu_count() or 1)
 
-@dataclass
+# Persistent cache of chunked documents keyed by PDF content hash and chunk
+# configuration, next to the embedding cache. Entries store chunk rows
+# without document identity so a hit can be re-minted for any document_id.
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache")
+os.makedirs(CACHE_DIR, exist_ok=True)
+chunk_cache = Cache(os.path.join(CACHE_DIR, "chunk_cache"))
+
+
+def _hash_pdf_file(pdf_path: str) -> str:
+    """SHA-256 of a PDF file, read in blocks rather than as one allocation."""
+    with open(pdf_path, "rb") as pdf_file:
+        return hashlib.file_digest(pdf_file, "sha256").hexdigest()
+
+# Single fused pattern for the whitespace cleanup passes: collapsed newlines,
+# collapsed spaces and form feeds are handled in one scan over the text
+_WHITESPACE_RE = re.compile(r'\n{3,}| {2,}|\f')
+
+
+def _whitespace_sub(match: "re.Match") -> str:
+    """Replacement callback for _WHITESPACE_RE."""
+    token = match.group(0)
+    if token[0] == '\n':
+        return '\n\n'
+    if token[0] == ' ':
+        return ' '
+    return ''  # Form feed
+
+
+# Hyphenated line breaks and whitespace before punctuation, fixed per page
+_HYPHEN_BREAK_RE = re.compile(r'(\w+)-\n(\w+)')
+_PUNCT_SPACE_RE = re.compile(r'\s+([.,;:!?])')
+
+# Break-point patterns for chunk boundaries, located once per page.
+# The paragraph pattern uses a lookahead so finditer reports every
+# position where '\n\n' starts: runs like '\n\n\n' (which survive
+# cleaning, e.g. from '\n\f\n\n') contain two overlapping break
+# positions, and plain finditer(r'\n\n') would skip the second one
+# that rfind-based scanning could choose.
+_PARA_BREAK_RE = re.compile(r'\n(?=\n)')
+_SENT_BREAK_RE = re.compile(r'[.!?] ')
+_SPACE_RE = re.compile(r' ')
+
+
+def _last_break(positions: List[int], start: int, limit: int) -> int:
+    """Return the largest position in [start, limit) from a sorted list, or -1."""
+    idx = bisect_left(positions, limit) - 1
+    if idx >= 0 and positions[idx] >= start:
+        return positions[idx]
+    return -1
+
+
+def _compute_chunk_spans(text_len: int, para_breaks: List[int],
+                         sent_breaks: List[int], space_breaks: List[int],
+                         chunk_size: int, chunk_overlap: int) -> List[Tuple[int, int]]:
+    """
+    Compute the (start, end) slice for every chunk of a page in one pass.
+
+    Pure arithmetic over the precomputed break-position arrays — no string
+    access at all — so all boundary decisions for a page happen up front and
+    chunk construction is just slicing.
+
+    Args:
+        text_len: Length of the cleaned page text
+        para_breaks: Sorted positions of paragraph breaks ('\\n\\n')
+        sent_breaks: Sorted positions of sentence breaks ('. ', '! ', '? ')
+        space_breaks: Sorted positions of spaces
+        chunk_size: Maximum number of characters per chunk
+        chunk_overlap: Number of characters to overlap between chunks
+
+    Returns:
+        List of (start, end) tuples, one per chunk
+    """
+    spans = []
+    start = 0
+
+    while start < text_len:
+        # Calculate end position with respect to chunk size
+        end = start + chunk_size
+
+        # If we're not at the end of the text, try to find a good break point
+        if end < text_len:
+            # Try to break at paragraph, then sentence, then word boundary
+            # (two-character patterns must start before end - 1 to fit)
+            paragraph_break = _last_break(para_breaks, start, end - 1)
+            if paragraph_break != -1 and paragraph_break > start + chunk_size // 2:
+                end = paragraph_break + 2  # Include the newlines
+            else:
+                # Look for sentence boundary (., !, ?)
+                sentence_break = _last_break(sent_breaks, start, end - 1)
+                if sentence_break != -1 and sentence_break > start + chunk_size // 2:
+                    end = sentence_break + 2  # Include the period and space
+                else:
+                    # Fall back to word boundary
+                    space_pos = _last_break(space_breaks, start, end)
+                    if space_pos != -1 and space_pos > start + chunk_size // 4:
+                        end = space_pos + 1  # Include the space
+
+        spans.append((start, end))
+
+        # Move start position for next chunk, considering overlap
+        start = end - chunk_overlap
+
+        # Ensure we're making progress
+        if start <= 0 or start >= text_len:
+            break
+
+    return spans
+
+
+@dataclass(frozen=True, slots=True)
 class TextChunk:
-    """Data class to store text chunks and their metadata."""
+    """Data class to store text chunks and their metadata.
+
+    Slots drop the per-instance __dict__ (chunks are created by the
+    thousand per document) and frozen instances are hashable, so chunks
+    can be deduplicated directly when needed.
+    """
     chunk_id: str
     text: str
     page_number: int
@@ -40,46 +163,193 @@ class PDFProcessor:
         """
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-    
-    def extract_text_from_pdf(self, pdf_path: str) -> Dict[int, str]:
+
+    @staticmethod
+    @contextmanager
+    def _open_pdf(pdf_bytes: bytes) -> Iterator["fitz.Document"]:
         """
-        Extract text from a PDF file.
-        
+        Open PDF bytes as a managed fitz.Document, closed on exit.
+
+        A single open serves every consumer of the document (page streaming
+        and any metadata reads), so the PDF container is parsed exactly once.
+
+        Args:
+            pdf_bytes: PDF content as bytes
+
+        Raises:
+            ValueError: If the bytes cannot be parsed as a PDF
+        """
+        try:
+            pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
+        except Exception as e:
+            raise ValueError(f"Error extracting text from PDF bytes: {str(e)}")
+
+        try:
+            yield pdf_document
+        finally:
+            pdf_document.close()
+
+    @staticmethod
+    @contextmanager
+    def _open_pdf_path(pdf_path: str) -> Iterator["fitz.Document"]:
+        """
+        Open a PDF file as a managed fitz.Document, closed on exit.
+
         Args:
             pdf_path: Path to the PDF file
-            
-        Returns:
-            Dictionary mapping page numbers (0-indexed) to text content
-        
+
         Raises:
             FileNotFoundError: If the PDF file doesn't exist
             ValueError: If the file is not a valid PDF
         """
         if not os.path.exists(pdf_path):
             raise FileNotFoundError(f"PDF file not found: {pdf_path}")
-        
+
         if not pdf_path.lower().endswith('.pdf'):
             raise ValueError(f"File is not a PDF: {pdf_path}")
-        
+
         try:
-            # Open the PDF
             pdf_document = fitz.open(pdf_path)
-            
-            # Extract text from each page
-            page_text = {}
-            for page_num, page in enumerate(pdf_document):
-                text = page.get_text()
-                # Only add pages that have actual text content
-                if text.strip():
-                    page_text[page_num] = text
-            
-            # Close the document
-            pdf_document.close()
-            
-            return page_text
-            
         except Exception as e:
             raise ValueError(f"Error extracting text from PDF: {str(e)}")
+
+        try:
+            yield pdf_document
+        finally:
+            pdf_document.close()
+
+    @staticmethod
+    def _iter_page_text(pdf_document: "fitz.Document",
+                        reopen: Optional[Callable[[], "fitz.Document"]] = None
+                        ) -> Iterator[Tuple[int, str]]:
+        """
+        Yield (page_number, text) for every non-empty page of an open document.
+
+        PyMuPDF releases the GIL while decoding glyphs, but a fitz.Document
+        is not thread-safe, so parallel extraction requires a `reopen`
+        callable that gives each worker thread its own handle on the source.
+        With one, pages are extracted in windows of EXTRACT_WORKERS across a
+        small thread pool — only one window of page texts is resident at a
+        time, keeping peak memory flat on large documents. Without one,
+        extraction stays serial on the shared document. Empty and
+        whitespace-only pages are dropped.
+
+        Args:
+            pdf_document: An open fitz.Document
+            reopen: Optional zero-argument callable returning a fresh
+                fitz.Document over the same source, one per worker thread
+
+        Yields:
+            Tuples of (page number (0-indexed), text content)
+        """
+        page_count = pdf_document.page_count
+        if page_count <= 1 or reopen is None:
+            for page_num in range(page_count):
+                text = pdf_document[page_num].get_text("text")
+                if text and not text.isspace():
+                    yield page_num, text
+            return
+
+        # One document handle per worker thread, opened lazily on the
+        # thread's first page and tracked for closing when iteration ends
+        thread_docs = threading.local()
+        open_docs: List["fitz.Document"] = []
+        open_docs_lock = threading.Lock()
+
+        def extract_page(page_num: int) -> str:
+            doc = getattr(thread_docs, "doc", None)
+            if doc is None:
+                doc = thread_docs.doc = reopen()
+                with open_docs_lock:
+                    open_docs.append(doc)
+            return doc[page_num].get_text("text")
+
+        try:
+            with ThreadPoolExecutor(max_workers=EXTRACT_WORKERS) as executor:
+                for window_start in range(0, page_count, EXTRACT_WORKERS):
+                    window = range(window_start,
+                                   min(window_start + EXTRACT_WORKERS, page_count))
+                    texts = executor.map(extract_page, window)
+                    for page_num, text in zip(window, texts):
+                        if text and not text.isspace():
+                            yield page_num, text
+        finally:
+            for doc in open_docs:
+                doc.close()
+
+    @classmethod
+    def _extract_pages(cls, pdf_document: "fitz.Document") -> Dict[int, str]:
+        """
+        Extract text from every page of an open document into a dictionary.
+
+        Thin materializing wrapper around _iter_page_text, kept for callers
+        that need random access to pages.
+
+        Args:
+            pdf_document: An open fitz.Document
+
+        Returns:
+            Dictionary mapping page numbers (0-indexed) to text content
+        """
+        return dict(cls._iter_page_text(pdf_document))
+
+    def _iter_pages(self, pdf_bytes: bytes, filename: str) -> Iterator[Tuple[int, str]]:
+        """
+        Stream (page_number, text) pairs from PDF bytes.
+
+        Args:
+            pdf_bytes: PDF content as bytes
+            filename: Original filename for reference
+
+        Yields:
+            Tuples of (page number (0-indexed), text content)
+
+        Raises:
+            ValueError: If the bytes cannot be parsed as a PDF
+        """
+        with self._open_pdf(pdf_bytes) as pdf_document:
+            yield from self._iter_page_text(
+                pdf_document,
+                reopen=lambda: fitz.open(stream=pdf_bytes, filetype="pdf")
+            )
+
+    def _iter_pages_from_path(self, pdf_path: str) -> Iterator[Tuple[int, str]]:
+        """
+        Stream (page_number, text) pairs from a PDF file.
+
+        Args:
+            pdf_path: Path to the PDF file
+
+        Yields:
+            Tuples of (page number (0-indexed), text content)
+
+        Raises:
+            FileNotFoundError: If the PDF file doesn't exist
+            ValueError: If the file is not a valid PDF
+        """
+        with self._open_pdf_path(pdf_path) as pdf_document:
+            yield from self._iter_page_text(
+                pdf_document,
+                reopen=lambda: fitz.open(pdf_path)
+            )
+
+    def extract_text_from_pdf(self, pdf_path: str) -> Dict[int, str]:
+        """
+        Extract text from a PDF file.
+        
+        Args:
+            pdf_path: Path to the PDF file
+            
+        Returns:
+            Dictionary mapping page numbers (0-indexed) to text content
+        
+        Raises:
+            FileNotFoundError: If the PDF file doesn't exist
+            ValueError: If the file is not a valid PDF
+        """
+        # Only fitz.open is wrapped (inside _open_pdf_path); the extraction
+        # loop itself runs without an enclosing exception handler
+        return dict(self._iter_pages_from_path(pdf_path))
     
     def extract_text_from_bytes(self, pdf_bytes: bytes, filename: str) -> Dict[int, str]:
         """
@@ -95,25 +365,9 @@ class PDFProcessor:
         Raises:
             ValueError: If the bytes cannot be parsed as a PDF
         """
-        try:
-            # Open the PDF from memory
-            pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
-            
-            # Extract text from each page
-            page_text = {}
-            for page_num, page in enumerate(pdf_document):
-                text = page.get_text()
-                # Only add pages that have actual text content
-                if text.strip():
-                    page_text[page_num] = text
-            
-            # Close the document
-            pdf_document.close()
-            
-            return page_text
-            
-        except Exception as e:
-            raise ValueError(f"Error extracting text from PDF bytes: {str(e)}")
+        # Only fitz.open is wrapped (inside _open_pdf); the extraction loop
+        # itself runs without an enclosing exception handler
+        return dict(self._iter_pages(pdf_bytes, filename))
     
     def clean_text(self, text: str) -> str:
         """
@@ -125,20 +379,15 @@ class PDFProcessor:
         Returns:
             Cleaned text
         """
-        # Replace multiple newlines with a single one
-        text = re.sub(r'\n{3,}', '\n\n', text)
-        
-        # Replace multiple spaces with a single one
-        text = re.sub(r' {2,}', ' ', text)
-        
-        # Remove form feed characters
-        text = text.replace('\f', '')
-        
+        # Collapse newline runs, collapse space runs and strip form feeds in
+        # a single pass over the text
+        text = _WHITESPACE_RE.sub(_whitespace_sub, text)
+
         # Fix hyphenated words that may have been split across lines
-        text = re.sub(r'(\w+)-\n(\w+)', r'\1\2', text)
-        
+        text = _HYPHEN_BREAK_RE.sub(r'\1\2', text)
+
         # Normalize whitespace around punctuation
-        text = re.sub(r'\s+([.,;:!?])', r'\1', text)
+        text = _PUNCT_SPACE_RE.sub(r'\1', text)
         
         # Trim whitespace
         text = text.strip()
@@ -160,11 +409,13 @@ class PDFProcessor:
             List of TextChunk objects
         """
         cleaned_text = self.clean_text(text)
-        
+
+        # Deterministic IDs avoid a urandom syscall and hex formatting per
+        # chunk, and make re-ingestion of the same document idempotent
         # If text is shorter than chunk size, return it as a single chunk
         if len(cleaned_text) <= self.chunk_size:
             return [TextChunk(
-                chunk_id=str(uuid.uuid4()),
+                chunk_id=f"{document_id}-{page_number}-00000",
                 text=cleaned_text,
                 page_number=page_number,
                 document_id=document_id,
@@ -173,39 +424,23 @@ class PDFProcessor:
                 end_char_idx=len(cleaned_text)
             )]
         
+        # Locate every candidate break point once, compute all chunk slices
+        # up front, then build the chunks by slicing
+        spans = _compute_chunk_spans(
+            len(cleaned_text),
+            [m.start() for m in _PARA_BREAK_RE.finditer(cleaned_text)],
+            [m.start() for m in _SENT_BREAK_RE.finditer(cleaned_text)],
+            [m.start() for m in _SPACE_RE.finditer(cleaned_text)],
+            self.chunk_size,
+            self.chunk_overlap
+        )
+
         chunks = []
-        start = 0
-        
-        while start < len(cleaned_text):
-            # Calculate end position with respect to chunk size
-            end = start + self.chunk_size
-            
-            # If we're not at the end of the text, try to find a good break point
-            if end < len(cleaned_text):
-                # Try to break at paragraph, then sentence, then word boundary
-                paragraph_break = cleaned_text.rfind('\n\n', start, end)
-                if paragraph_break != -1 and paragraph_break > start + self.chunk_size // 2:
-                    end = paragraph_break + 2  # Include the newlines
-                else:
-                    # Look for sentence boundary (., !, ?)
-                    sentence_break = max(
-                        cleaned_text.rfind('. ', start, end),
-                        cleaned_text.rfind('! ', start, end),
-                        cleaned_text.rfind('? ', start, end)
-                    )
-                    if sentence_break != -1 and sentence_break > start + self.chunk_size // 2:
-                        end = sentence_break + 2  # Include the period and space
-                    else:
-                        # Fall back to word boundary
-                        space_pos = cleaned_text.rfind(' ', start, end)
-                        if space_pos != -1 and space_pos > start + self.chunk_size // 4:
-                            end = space_pos + 1  # Include the space
-            
-            # Create a chunk
+        for start, end in spans:
             chunk_text = cleaned_text[start:end].strip()
             if chunk_text:  # Only add non-empty chunks
                 chunks.append(TextChunk(
-                    chunk_id=str(uuid.uuid4()),
+                    chunk_id=f"{document_id}-{page_number}-{len(chunks):05d}",
                     text=chunk_text,
                     page_number=page_number,
                     document_id=document_id,
@@ -213,47 +448,152 @@ class PDFProcessor:
                     start_char_idx=start,
                     end_char_idx=end
                 ))
-            
-            # Move start position for next chunk, considering overlap
-            start = end - self.chunk_overlap
-            
-            # Ensure we're making progress
-            if start <= 0 or start >= len(cleaned_text):
-                break
-        
+
         return chunks
     
-    def process_pdf(self, pdf_path: str, document_id: str = None) -> List[TextChunk]:
+    def chunk_document(self, pages: Iterator[Tuple[int, str]],
+                       document_id: str, document_name: str) -> List[TextChunk]:
+        """
+        Chunk an entire document in one pass, letting chunks cross pages.
+
+        Page texts are cleaned individually, joined with a paragraph break
+        and chunked as one buffer, so sentences split across page boundaries
+        stay together and the boundary-search setup runs once per document
+        instead of once per page. Each chunk is attributed to the page where
+        it starts, recovered by binary search over the page start offsets.
+
+        Args:
+            pages: Iterable of (page_number, raw text) pairs
+            document_id: Unique identifier for the document
+            document_name: Name of the document
+
+        Returns:
+            List of TextChunk objects with document-global character offsets
+        """
+        page_numbers = []
+        page_offsets = []
+        cleaned_pages = []
+        offset = 0
+        for page_num, text in pages:
+            cleaned = self.clean_text(text)
+            if not cleaned:
+                continue
+            page_numbers.append(page_num)
+            page_offsets.append(offset)
+            cleaned_pages.append(cleaned)
+            offset += len(cleaned) + 2  # Account for the joining '\n\n'
+
+        if not cleaned_pages:
+            return []
+
+        full_text = "\n\n".join(cleaned_pages)
+
+        spans = _compute_chunk_spans(
+            len(full_text),
+            [m.start() for m in _PARA_BREAK_RE.finditer(full_text)],
+            [m.start() for m in _SENT_BREAK_RE.finditer(full_text)],
+            [m.start() for m in _SPACE_RE.finditer(full_text)],
+            self.chunk_size,
+            self.chunk_overlap
+        )
+
+        # Slice every span and attribute its page first (dropping empties),
+        # then build all chunks in one comprehension — list comprehensions
+        # grow through CPython's optimized path instead of repeated appends
+        text_len = len(full_text)
+        entries = [
+            (start, min(end, text_len), chunk_str,
+             page_numbers[bisect_right(page_offsets, start) - 1])
+            for start, end in spans
+            if (chunk_str := full_text[start:end].strip())
+        ]
+        return [
+            TextChunk(
+                chunk_id=f"{document_id}-{page_number}-{index:05d}",
+                text=chunk_str,
+                page_number=page_number,
+                document_id=document_id,
+                document_name=document_name,
+                start_char_idx=start,
+                end_char_idx=end
+            )
+            for index, (start, end, chunk_str, page_number) in enumerate(entries)
+        ]
+
+    def _chunk_cache_key(self, digest: str) -> str:
+        """Cache key binding PDF content to the active chunk configuration."""
+        return f"{digest}_{self.chunk_size}_{self.chunk_overlap}"
+
+    @staticmethod
+    def _rows_from_chunks(chunks: List[TextChunk]) -> List[Tuple[int, int, str, int, int]]:
+        """Strip document identity from chunks for caching."""
+        return [
+            (chunk.page_number,
+             int(chunk.chunk_id.rsplit('-', 1)[1]),
+             chunk.text,
+             chunk.start_char_idx,
+             chunk.end_char_idx)
+            for chunk in chunks
+        ]
+
+    @staticmethod
+    def _chunks_from_rows(rows: List[Tuple[int, int, str, int, int]],
+                          document_id: str, document_name: str) -> List[TextChunk]:
+        """Re-mint cached chunk rows as TextChunks for a document."""
+        return [
+            TextChunk(
+                chunk_id=f"{document_id}-{page_number}-{chunk_index:05d}",
+                text=text,
+                page_number=page_number,
+                document_id=document_id,
+                document_name=document_name,
+                start_char_idx=start_char_idx,
+                end_char_idx=end_char_idx
+            )
+            for page_number, chunk_index, text, start_char_idx, end_char_idx in rows
+        ]
+
+    def process_pdf(self, pdf_path: str, document_id: str = None,
+                    document_name: str = None) -> List[TextChunk]:
         """
         Process a PDF file: extract text and create chunks.
-        
+
         Args:
             pdf_path: Path to the PDF file
             document_id: Optional unique identifier for the document
                         (will be generated if not provided)
-                        
+            document_name: Optional display name for the document
+                        (defaults to the file's basename)
+
         Returns:
             List of TextChunk objects containing the processed text
         """
         if document_id is None:
             document_id = str(uuid.uuid4())
-        
-        document_name = os.path.basename(pdf_path)
-        
-        # Extract text from PDF
-        page_text = self.extract_text_from_pdf(pdf_path)
-        
-        # Process each page and create chunks
-        all_chunks = []
-        for page_num, text in page_text.items():
-            page_chunks = self.chunk_text(
-                text, 
-                page_number=page_num,
-                document_id=document_id,
-                document_name=document_name
-            )
-            all_chunks.extend(page_chunks)
-        
+
+        if document_name is None:
+            document_name = os.path.basename(pdf_path)
+
+        # Every chunk references these strings; interning keeps a single
+        # shared copy however many chunks the document produces
+        document_id = sys.intern(document_id)
+        document_name = sys.intern(document_name)
+
+        # Identical content under the same chunk configuration skips
+        # extraction and chunking entirely
+        cache_key = self._chunk_cache_key(_hash_pdf_file(pdf_path))
+        rows = chunk_cache.get(cache_key)
+        if rows is not None:
+            return self._chunks_from_rows(rows, document_id, document_name)
+
+        # Chunk the whole document in one pass so chunks can cross pages
+        all_chunks = self.chunk_document(
+            self._iter_pages_from_path(pdf_path),
+            document_id=document_id,
+            document_name=document_name
+        )
+
+        chunk_cache.set(cache_key, self._rows_from_chunks(all_chunks))
         return all_chunks
     
     def process_pdf_bytes(self, pdf_bytes: bytes, filename: str, 
@@ -272,21 +612,27 @@ class PDFProcessor:
         """
         if document_id is None:
             document_id = str(uuid.uuid4())
-        
-        # Extract text from PDF bytes
-        page_text = self.extract_text_from_bytes(pdf_bytes, filename)
-        
-        # Process each page and create chunks
-        all_chunks = []
-        for page_num, text in page_text.items():
-            page_chunks = self.chunk_text(
-                text, 
-                page_number=page_num,
-                document_id=document_id,
-                document_name=filename
-            )
-            all_chunks.extend(page_chunks)
-        
+
+        # Every chunk references these strings; interning keeps a single
+        # shared copy however many chunks the document produces
+        document_id = sys.intern(document_id)
+        filename = sys.intern(filename)
+
+        # Identical content under the same chunk configuration skips
+        # extraction and chunking entirely
+        cache_key = self._chunk_cache_key(hashlib.sha256(pdf_bytes).hexdigest())
+        rows = chunk_cache.get(cache_key)
+        if rows is not None:
+            return self._chunks_from_rows(rows, document_id, filename)
+
+        # Chunk the whole document in one pass so chunks can cross pages
+        all_chunks = self.chunk_document(
+            self._iter_pages(pdf_bytes, filename),
+            document_id=document_id,
+            document_name=filename
+        )
+
+        chunk_cache.set(cache_key, self._rows_from_chunks(all_chunks))
         return all_chunks
     
     def get_document_statistics(self, chunks: List[TextChunk]) -> Dict[str, Any]:
@@ -307,12 +653,14 @@ class PDFProcessor:
                 "estimated_tokens": 0
             }
         
-        # Count unique pages
-        unique_pages = len(set(chunk.page_number for chunk in chunks))
-        
-        # Count total characters
-        total_chars = sum(len(chunk.text) for chunk in chunks)
-        
+        # Count unique pages and total characters in a single pass
+        pages = set()
+        total_chars = 0
+        for chunk in chunks:
+            pages.add(chunk.page_number)
+            total_chars += len(chunk.text)
+        unique_pages = len(pages)
+
         # Rough estimate of tokens (assuming ~4 chars per token on average)
         estimated_tokens = total_chars // 4
         
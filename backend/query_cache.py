@@ -0,0 +1,138 @@
+"""
+Semantic cache for query responses.
+
+Repeated questions rarely repeat verbatim — users paraphrase. This module
+keeps a small per-document matrix of L2-normalized query embeddings,
+quantized to int8, so a new query whose embedding is within a
+cosine-similarity threshold of a cached one returns the cached response
+without touching the retrieval or generation pipeline at all. Lookup is a
+single integer matrix-vector product over at most a few hundred rows —
+well under a millisecond — and the int8 codes hold the cache at a quarter
+of the float32 footprint.
+"""
+
+import os
+import copy
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("query_cache")
+
+# Cosine similarity a new query must reach against a cached one to count as
+# a semantic hit, and the per-document entry bound
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.85"))
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "256"))
+
+# Quantization scale: normalized components lie in [-1, 1], mapped to int8
+_Q_SCALE = 127
+_Q_SCALE_SQ_INV = 1.0 / (_Q_SCALE * _Q_SCALE)
+
+
+class SemanticQueryCache:
+    """Nearest-neighbour cache of query responses keyed by query embedding.
+
+    Embeddings are L2-normalized and stored as int8 codes; the integer dot
+    product of two codes divided by 127^2 approximates their cosine
+    similarity to within quantization error (~1e-2), far below the hit
+    threshold, so a top-1 score at or above the threshold means the
+    incoming query is a close paraphrase of a cached one.
+    """
+
+    def __init__(self, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 max_size: int = SEMANTIC_CACHE_SIZE):
+        """
+        Initialize the cache.
+
+        Args:
+            threshold: Minimum cosine similarity for a cache hit
+            max_size: Maximum cached entries per scope before FIFO eviction
+        """
+        self.threshold = threshold
+        self.max_size = max_size
+        self._codes: Dict[Any, np.ndarray] = {}
+        self._responses: Dict[Any, List[Dict[str, Any]]] = {}
+        # Handlers run in the server's thread pool, so matrix mutation and
+        # search are serialized behind a lock
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _quantize(embedding: List[float]) -> np.ndarray:
+        """L2-normalize an embedding and quantize it to an int8 code row."""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        if norm > 0.0:
+            vector = vector / norm
+        return np.clip(np.round(vector * _Q_SCALE), -_Q_SCALE, _Q_SCALE).astype(np.int8)
+
+    def get(self, scope: Any, embedding: List[float]) -> Optional[Dict[str, Any]]:
+        """
+        Look up the closest cached query within the scope.
+
+        Args:
+            scope: Cache scope, e.g. (document_id, top_k)
+            embedding: Embedding of the incoming query
+
+        Returns:
+            The cached response if the best match clears the similarity
+            threshold, otherwise None
+        """
+        query_code = self._quantize(embedding).astype(np.int32)
+        with self._lock:
+            codes = self._codes.get(scope)
+            if codes is None or not len(codes):
+                return None
+
+            # One integer matrix-vector product scores every cached entry
+            scores = codes.astype(np.int32) @ query_code
+            best = int(scores.argmax())
+            similarity = float(scores[best]) * _Q_SCALE_SQ_INV
+            if similarity >= self.threshold:
+                logger.info("Semantic cache hit (similarity %.3f)", similarity)
+                # Deep-copied so callers can't mutate the cached response
+                return copy.deepcopy(self._responses[scope][best])
+            return None
+
+    def put(self, scope: Any, embedding: List[float], response: Dict[str, Any]) -> None:
+        """
+        Cache a response under the scope, evicting the oldest entry if full.
+
+        Args:
+            scope: Cache scope, e.g. (document_id, top_k)
+            embedding: Embedding of the query that produced the response
+            response: Full response dict to return on future hits
+        """
+        code = self._quantize(embedding)
+        with self._lock:
+            codes = self._codes.get(scope)
+            responses = self._responses.setdefault(scope, [])
+            if codes is None:
+                self._codes[scope] = code[None, :]
+                responses.append(response)
+                return
+
+            if len(codes) >= self.max_size:
+                # FIFO eviction keeps row positions aligned with responses
+                codes = codes[1:]
+                responses.pop(0)
+
+            self._codes[scope] = np.vstack((codes, code[None, :]))
+            responses.append(response)
+
+    def drop(self, document_id: str) -> None:
+        """Discard all cached entries whose scope belongs to a document."""
+        with self._lock:
+            stale = [scope for scope in self._codes
+                     if scope == document_id or
+                     (isinstance(scope, tuple) and scope and scope[0] == document_id)]
+            for scope in stale:
+                del self._codes[scope]
+                del self._responses[scope]
+
+
+# Singleton shared by the query pipeline
+semantic_query_cache = SemanticQueryCache()
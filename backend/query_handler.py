@@ -8,17 +8,25 @@ This handles:
 5. Response generation with Pydantic AI (NEW)
 """
 
+import io
 import os
 import time
+import asyncio
 import logging
+import threading
 from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
-from collections import defaultdict
+import xxhash
+from cachetools import TTLCache
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import groupby
+from operator import itemgetter
 
-from embeddings import get_embedding
+from embeddings import get_query_embedding
 from vector_store import VectorStore
-from pdf_processing import TextChunk
-from response_generator import generate_response, response_generator
+from query_cache import semantic_query_cache
+from scorer import cosine_batch
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -27,6 +35,97 @@ logger = logging.getLogger("query_handler")
 # Configuration
 MIN_SIMILARITY_THRESHOLD = 0.5  # Minimum similarity score to consider a chunk relevant
 
+# In-process LRU of full query responses: repeated (query, document, top_k)
+# requests skip the embedding / search / generation pipeline entirely
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+_query_cache: "OrderedDict[Tuple[str, str, int], Dict[str, Any]]" = OrderedDict()
+
+
+# Generated responses keyed by (context hash, normalized query): queries
+# about the same document section assemble identical context, so repeats
+# skip the LLM call — the dominant latency — entirely. The TTL bounds how
+# long a stale answer can outlive a re-ingested document. xxh3 is a fast
+# non-cryptographic hash; the key is not security-critical.
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "600"))
+_response_cache: "TTLCache[Tuple[int, str], Dict[str, Any]]" = TTLCache(
+    maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL
+)
+# TTLCache is not thread-safe and generation runs in worker threads
+_response_cache_lock = threading.Lock()
+
+
+def _response_cache_key(context: str, query_text: str) -> Tuple[int, str]:
+    """Build the generation cache key from the context and the query."""
+    return (xxhash.xxh3_64_intdigest(context.encode("utf-8")),
+            query_text.strip().lower())
+
+
+def _response_ok(response: Dict[str, Any]) -> bool:
+    """
+    True when the pipeline produced a real generation worth caching.
+
+    Error and no-context fallbacks carry confidence 0.0; caching them
+    would pin one transient API failure as the answer for the process
+    lifetime, so only successful generations enter the cache layers and
+    a failed query is retried on its next occurrence.
+    """
+    structured = response.get("response") or {}
+    return structured.get("confidence", 0.0) > 0.0
+
+
+def _query_cache_get(key: Tuple[str, str, int]) -> Optional[Dict[str, Any]]:
+    """Return a cached query response and mark it most recently used."""
+    response = _query_cache.get(key)
+    if response is not None:
+        _query_cache.move_to_end(key)
+    return response
+
+
+def drop_cached_document(document_id: str) -> None:
+    """
+    Evict every exact-cache entry for a document.
+
+    The exact cache has no TTL, so without this a deleted document kept
+    answering from its cached chunks. Called from the document deletion
+    paths alongside semantic_query_cache.drop().
+    """
+    for key in [k for k in _query_cache if k[1] == document_id]:
+        del _query_cache[key]
+
+
+def _query_cache_put(key: Tuple[str, str, int], response: Dict[str, Any]) -> None:
+    """Insert a query response, evicting the least recently used entry."""
+    _query_cache[key] = response
+    _query_cache.move_to_end(key)
+    while len(_query_cache) > QUERY_CACHE_SIZE:
+        _query_cache.popitem(last=False)
+
+
+@lru_cache(maxsize=1024)
+def _assembled_context(entries: Tuple[Tuple[Any, Any, str], ...]) -> str:
+    """
+    Build the context string for a set of (page, position, text) entries.
+
+    A single lexicographic sort orders pages and the chunks within them, so
+    grouping needs no second sort; headers and chunk texts stream into one
+    buffer. Memoized because the same result set reappears frequently.
+    """
+    decorated = sorted(entries, key=itemgetter(0, 1))
+
+    buf = io.StringIO()
+    for page_num, group in groupby(decorated, key=itemgetter(0)):
+        # Add page header
+        buf.write(f"\n--- Page {page_num} ---\n\n")
+
+        # Add text from each chunk
+        for _, _, text in group:
+            if text:
+                buf.write(text.strip())
+                buf.write("\n\n")
+
+    return buf.getvalue().rstrip()
+
 
 class QueryProcessor:
     """Handles query processing, context retrieval, and response generation."""
@@ -56,62 +155,75 @@ class QueryProcessor:
         Returns:
             Dict containing query results, processed context, and generated response
         """
-        # Start timing the processing
-        start_time = time.time()
-        
+        # Start timing the processing; the monotonic ns counter avoids the
+        # wall-clock read and float arithmetic of time.time()
+        start_time = time.perf_counter_ns()
+
         # Generate query embedding
-        logger.info(f"Generating embedding for query: {query_text}")
-        query_embedding_time = time.time()
-        
+        logger.info("Generating embedding for query: %s", query_text)
+
         # Create namespace from document_id
-        namespace = f"doc_{document_id}"
+        namespace = "doc_" + document_id
         
         # Query the vector store
-        logger.info(f"Querying document {document_id} with: {query_text}")
-        top_k_retrieval = max(top_k * 3, 15)  # Retrieve more results than needed for filtering
-        similarity_search_time = time.time()
+        logger.info("Querying document %s with: %s", document_id, query_text)
+        # Retrieve more results than needed for filtering; 2x over-fetch
+        # keeps recall high while halving the metadata payload per search
+        top_k_retrieval = max(top_k * 2, 10)
+        similarity_search_time = time.perf_counter_ns()
         
-        # Use query expansion
+        # Use query expansion; with multiple variants the stored vectors
+        # come back too so the merged hits can be rescored comparably
         queries = self._expand_query(query_text)
+        include_values = len(queries) > 1
         all_results = []
-        
+
         # Query for each expanded query
         for query in queries:
-            results = self.vector_store.query(
-                query_text=query,
-                namespace=namespace,
-                top_k=top_k_retrieval,
-                include_metadata=True
+            all_results.extend(
+                self._search_variant(query, namespace, top_k_retrieval, include_values)
             )
-            all_results.extend(results)
-        
-        # Deduplicate results
-        unique_results = []
-        seen_ids = set()
-        for result in all_results:
-            if result["id"] not in seen_ids:
-                unique_results.append(result)
-                seen_ids.add(result["id"])
-        
-        search_duration = time.time() - similarity_search_time
+
+        # Deduplicate results, then rescore them against the original query
+        unique_results = self._deduplicate_results(all_results)
+        if include_values:
+            unique_results = self._rerank_results(get_query_embedding(query_text), unique_results)
+
+        search_duration_ns = time.perf_counter_ns() - similarity_search_time
         
-        # Apply relevance filtering
+        # Apply relevance filtering and take the final slice once
         filtered_results = self._filter_results_by_relevance(unique_results)
-        
+        top_results = filtered_results[:top_k]
+
         # Combine the retrieved chunks into a coherent context
-        context = self._assemble_context(filtered_results[:top_k])
+        context = self._assemble_context(top_results)
         
         # Generate a structured response using Pydantic AI
-        logger.info(f"Generating response for query: {query_text}")
-        response_generation_time = time.time()
-        
-        if filtered_results:
-            structured_response = generate_response(
-                query=query_text,
-                context=context,
-                results=filtered_results[:top_k],
-                document_id=document_id
-            )
+        logger.info("Generating response for query: %s", query_text)
+        response_generation_time = time.perf_counter_ns()
+
+        # Imported here so the OpenAI client behind the generator is only
+        # constructed once a query actually reaches the generation stage
+        from response_generator import generate_response, response_generator
+
+        if top_results:
+            # A novel query over an already-seen context (same retrieved
+            # chunks) reuses the generated response instead of calling the LLM
+            response_key = _response_cache_key(context, query_text)
+            with _response_cache_lock:
+                structured_response = _response_cache.get(response_key)
+            if structured_response is None:
+                structured_response = generate_response(
+                    query=query_text,
+                    context=context,
+                    results=top_results,
+                    document_id=document_id
+                )
+                # Generation failures come back with confidence 0.0; caching
+                # one would replay the error for the full TTL
+                if structured_response.get("confidence", 0.0) > 0.0:
+                    with _response_cache_lock:
+                        _response_cache[response_key] = structured_response
         else:
             # Use fallback if no results were found
             structured_response = response_generator.generate_fallback_response(
@@ -119,27 +231,188 @@ class QueryProcessor:
             ).model_dump()
             structured_response["generated_at"] = structured_response["generated_at"].isoformat()
             structured_response["formatted_answer"] = "I couldn't find relevant information in the document to answer your question. Please try rephrasing or asking something covered in the document."
-        
-        response_duration = time.time() - response_generation_time
-        
+
+        response_duration_ns = time.perf_counter_ns() - response_generation_time
+
         # Calculate total processing time
-        processing_time = time.time() - start_time
+        processing_time_ns = time.perf_counter_ns() - start_time
         
         # Prepare the response
         response = {
             "query": query_text,
             "document_id": document_id,
-            "results": filtered_results[:top_k],
-            "result_count": len(filtered_results[:top_k]),
+            "results": top_results,
+            "result_count": len(top_results),
             "context": context,
-            "processing_time_ms": round(processing_time * 1000),
-            "search_time_ms": round(search_duration * 1000),
-            "response_time_ms": round(response_duration * 1000),
+            "processing_time_ms": processing_time_ns // 1_000_000,
+            "search_time_ms": search_duration_ns // 1_000_000,
+            "response_time_ms": response_duration_ns // 1_000_000,
             "response": structured_response
         }
         
         return response
     
+    def _search_variant(self, query: str, namespace: str, top_k_retrieval: int,
+                        include_values: bool = False) -> List[Dict[str, Any]]:
+        """Embed one query variant (memoized) and search the vector store."""
+        return self.vector_store.query(
+            query_text=query,
+            namespace=namespace,
+            top_k=top_k_retrieval,
+            include_metadata=True,
+            query_embedding=get_query_embedding(query),
+            include_values=include_values
+        )
+
+    def _rerank_results(self, query_embedding: List[float],
+                        results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Re-score merged variant hits against the original query embedding.
+
+        Pinecone scores each expansion variant against its own embedding,
+        so once the per-variant result lists are merged the scores are not
+        comparable. With the stored vectors fetched alongside the matches,
+        one cosine_batch call rescores every candidate against the user's
+        actual query; the vectors are then dropped from the payload and
+        the merged list reordered by the now-comparable scores.
+        """
+        vectors = [result.pop("values", None) for result in results]
+        if len(results) < 2 or any(v is None for v in vectors):
+            return results
+        scores = cosine_batch(query_embedding, np.asarray(vectors, dtype=np.float32))
+        for result, score in zip(results, scores):
+            result["score"] = float(score)
+        results.sort(key=itemgetter("score"), reverse=True)
+        return results
+
+    @staticmethod
+    def _deduplicate_results(all_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop duplicate hits (by vector id) across query variants, keeping order."""
+        unique_results = []
+        seen_ids = set()
+        for result in all_results:
+            if result["id"] not in seen_ids:
+                unique_results.append(result)
+                seen_ids.add(result["id"])
+        return unique_results
+
+    async def aretrieve(self, query_text: str, document_id: str,
+                        top_k: int = 5) -> Tuple[List[Dict[str, Any]], str]:
+        """
+        Run the retrieval half of the pipeline: search, filter, assemble.
+
+        The searches for the original query and its expansions run
+        concurrently in worker threads. No response is generated — the
+        streaming endpoint generates separately while consuming this.
+
+        Args:
+            query_text: The user's query
+            document_id: ID of the document to query against
+            top_k: Number of top results to retrieve
+
+        Returns:
+            Tuple of (top results, assembled context string)
+        """
+        namespace = "doc_" + document_id
+        top_k_retrieval = max(top_k * 2, 10)
+
+        queries = self._expand_query(query_text)
+        include_values = len(queries) > 1
+        results_per_query = await asyncio.gather(*(
+            asyncio.to_thread(self._search_variant, query, namespace, top_k_retrieval,
+                              include_values)
+            for query in queries
+        ))
+        all_results = [result for results in results_per_query for result in results]
+
+        # Deduplicate results, then rescore them against the original query
+        unique_results = self._deduplicate_results(all_results)
+        if include_values:
+            unique_results = self._rerank_results(get_query_embedding(query_text), unique_results)
+
+        # Apply relevance filtering and take the final slice once
+        filtered_results = self._filter_results_by_relevance(unique_results)
+        top_results = filtered_results[:top_k]
+
+        # Combine the retrieved chunks into a coherent context
+        context = self._assemble_context(top_results)
+        return top_results, context
+
+    async def aprocess_query(self, query_text: str, document_id: str,
+                             top_k: int = 5) -> Dict[str, Any]:
+        """
+        Async variant of process_query that overlaps independent work.
+
+        The vector searches for all expanded query variants run concurrently
+        in worker threads, and response generation is dispatched off the
+        event loop, so total latency approaches the slowest stage rather
+        than the sum of the stages.
+
+        Args:
+            query_text: The user's query
+            document_id: ID of the document to query against
+            top_k: Number of top results to retrieve
+
+        Returns:
+            Dict containing query results, processed context, and generated response
+        """
+        start_time = time.perf_counter_ns()
+
+        logger.info("Querying document %s with: %s", document_id, query_text)
+        similarity_search_time = time.perf_counter_ns()
+
+        top_results, context = await self.aretrieve(query_text, document_id, top_k)
+        search_duration_ns = time.perf_counter_ns() - similarity_search_time
+
+        # Generate a structured response using Pydantic AI
+        logger.info("Generating response for query: %s", query_text)
+        response_generation_time = time.perf_counter_ns()
+
+        # Deferred import, mirroring process_query
+        from response_generator import agenerate_response, response_generator
+
+        if top_results:
+            # Same context-hash reuse as the sync path
+            response_key = _response_cache_key(context, query_text)
+            with _response_cache_lock:
+                structured_response = _response_cache.get(response_key)
+            if structured_response is None:
+                # Awaited natively: the AsyncOpenAI call multiplexes on the
+                # event loop rather than occupying a worker thread
+                structured_response = await agenerate_response(
+                    query=query_text,
+                    context=context,
+                    results=top_results,
+                    document_id=document_id
+                )
+                # Same confidence gate as the sync path: never cache a
+                # failed generation
+                if structured_response.get("confidence", 0.0) > 0.0:
+                    with _response_cache_lock:
+                        _response_cache[response_key] = structured_response
+        else:
+            # Use fallback if no results were found
+            structured_response = response_generator.generate_fallback_response(
+                query=query_text
+            ).model_dump()
+            structured_response["generated_at"] = structured_response["generated_at"].isoformat()
+            structured_response["formatted_answer"] = "I couldn't find relevant information in the document to answer your question. Please try rephrasing or asking something covered in the document."
+
+        response_duration_ns = time.perf_counter_ns() - response_generation_time
+        processing_time_ns = time.perf_counter_ns() - start_time
+
+        return {
+            "query": query_text,
+            "document_id": document_id,
+            "results": top_results,
+            "result_count": len(top_results),
+            "context": context,
+            "processing_time_ms": processing_time_ns // 1_000_000,
+            "search_time_ms": search_duration_ns // 1_000_000,
+            "response_time_ms": response_duration_ns // 1_000_000,
+            "response": structured_response
+        }
+
     def _filter_results_by_relevance(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Filter results by relevance score.
@@ -152,18 +425,19 @@ class QueryProcessor:
         """
         if not results:
             return []
-            
-        # Filter results by similarity score
-        filtered_results = [
-            result for result in results 
-            if result.get("score", 0) >= MIN_SIMILARITY_THRESHOLD
-        ]
-        
-        # If no results meet the threshold but we have results, return the best one
-        if not filtered_results and results:
-            filtered_results = [max(results, key=lambda x: x.get("score", 0))]
-            
-        return filtered_results
+
+        # Filter by similarity score with one vectorized pass: build the
+        # score array once, mask it, and fall back via argmax
+        scores = np.fromiter(
+            (result.get("score", 0.0) for result in results),
+            dtype=np.float32, count=len(results)
+        )
+        mask = scores >= MIN_SIMILARITY_THRESHOLD
+        if mask.any():
+            return [results[i] for i in np.nonzero(mask)[0]]
+
+        # If no results meet the threshold, return the best one
+        return [results[int(scores.argmax())]]
     
     def _assemble_context(self, results: List[Dict[str, Any]]) -> str:
         """
@@ -177,42 +451,19 @@ class QueryProcessor:
         """
         if not results:
             return ""
-            
-        # Sort results by page number and position to maintain document order
-        sorted_results = sorted(
-            results,
-            key=lambda x: (
-                x.get("metadata", {}).get("page_number", 0),
-                x.get("metadata", {}).get("chunk_index", 0)
-            )
+
+        # Reduce each result to its hashable (page, position, text) triple;
+        # identical result sets (pagination, "show more") then hit the
+        # memoized assembly below without re-sorting or re-joining anything.
+        # Scores are deliberately absent from the key so rescored repeats
+        # of the same chunks collide.
+        entries = tuple(
+            ((metadata := result.get("metadata") or {}).get("page_number", 0),
+             metadata.get("chunk_index", 0),
+             metadata.get("text", ""))
+            for result in results
         )
-        
-        # Group by page for better context assembly
-        page_chunks = defaultdict(list)
-        for result in sorted_results:
-            metadata = result.get("metadata", {})
-            page_num = metadata.get("page_number", 0)
-            page_chunks[page_num].append(result)
-        
-        # Assemble the context with page markers
-        context_parts = []
-        for page_num in sorted(page_chunks.keys()):
-            page_results = page_chunks[page_num]
-            
-            # Sort chunks within the page by position
-            page_results.sort(key=lambda x: x.get("metadata", {}).get("chunk_index", 0))
-            
-            # Add page header
-            context_parts.append(f"\n--- Page {page_num} ---\n")
-            
-            # Add text from each chunk
-            for result in page_results:
-                text = result.get("metadata", {}).get("text", "")
-                if text:
-                    context_parts.append(text.strip())
-        
-        # Join all parts with newlines between different sections
-        return "\n\n".join(context_parts)
+        return _assembled_context(entries)
 
     def _expand_query(self, query_text: str) -> List[str]:
         """Simple query expansion to improve retrieval."""
@@ -233,8 +484,17 @@ class QueryProcessor:
         return expanded_queries
 
 
-# Create a singleton instance
-query_processor = QueryProcessor()
+# Singleton instance, created on first use: constructing a QueryProcessor
+# connects to the vector store, which importing this module should not do
+_query_processor: Optional[QueryProcessor] = None
+
+
+def _get_query_processor() -> QueryProcessor:
+    """Return the shared QueryProcessor, constructing it on first call."""
+    global _query_processor
+    if _query_processor is None:
+        _query_processor = QueryProcessor()
+    return _query_processor
 
 
 def process_query(query_text: str, document_id: str, top_k: int = 5) -> Dict[str, Any]:
@@ -249,4 +509,145 @@ def process_query(query_text: str, document_id: str, top_k: int = 5) -> Dict[str
     Returns:
         Dict containing query results, processed context, and generated response
     """
-    return query_processor.process_query(query_text, document_id, top_k)
\ No newline at end of file
+    # Exact repeats hit the LRU without even embedding the query
+    cache_key = (query_text, document_id, top_k)
+    response = _query_cache_get(cache_key)
+    if response is not None:
+        return response
+
+    # Paraphrased repeats hit the semantic cache: one (memoized) embedding
+    # call plus a sub-millisecond nearest-neighbour search
+    scope = (document_id, top_k)
+    query_embedding = get_query_embedding(query_text)
+    response = semantic_query_cache.get(scope, query_embedding)
+    if response is not None:
+        _query_cache_put(cache_key, response)
+        return response
+
+    response = _get_query_processor().process_query(query_text, document_id, top_k)
+    if _response_ok(response):
+        _query_cache_put(cache_key, response)
+        semantic_query_cache.put(scope, query_embedding, response)
+    return response
+
+
+# In-flight pipeline runs keyed like the query cache, so concurrent
+# identical queries share one execution instead of racing the pipeline
+_inflight: Dict[Tuple[str, str, int], "asyncio.Task"] = {}
+
+
+async def _run_query_pipeline(cache_key: Tuple[str, str, int]) -> Dict[str, Any]:
+    """Run the cache-miss pipeline once and populate both cache layers."""
+    query_text, document_id, top_k = cache_key
+    scope = (document_id, top_k)
+    query_embedding = await asyncio.to_thread(get_query_embedding, query_text)
+    response = semantic_query_cache.get(scope, query_embedding)
+    if response is not None:
+        _query_cache_put(cache_key, response)
+        return response
+
+    response = await _get_query_processor().aprocess_query(query_text, document_id, top_k)
+    if _response_ok(response):
+        _query_cache_put(cache_key, response)
+        semantic_query_cache.put(scope, query_embedding, response)
+    return response
+
+
+async def aprocess_query(query_text: str, document_id: str, top_k: int = 5) -> Dict[str, Any]:
+    """
+    Async convenience function to process a query with caching.
+
+    Same cache layers as process_query (exact LRU, then semantic), with the
+    pipeline itself running through QueryProcessor.aprocess_query so the
+    event loop stays free and variant searches overlap. Concurrent requests
+    for the same (query, document, top_k) coalesce onto a single in-flight
+    pipeline run.
+
+    Args:
+        query_text: The user's query
+        document_id: ID of the document to query against
+        top_k: Number of top results to retrieve
+
+    Returns:
+        Dict containing query results, processed context, and generated response
+    """
+    cache_key = (query_text, document_id, top_k)
+    response = _query_cache_get(cache_key)
+    if response is not None:
+        return response
+
+    task = _inflight.get(cache_key)
+    if task is None:
+        task = asyncio.create_task(_run_query_pipeline(cache_key))
+        _inflight[cache_key] = task
+        task.add_done_callback(lambda _: _inflight.pop(cache_key, None))
+
+    # Shielded so one caller disconnecting doesn't cancel the shared run
+    return await asyncio.shield(task)
+
+
+async def astream_query(query_text: str, document_id: str, top_k: int = 5):
+    """
+    Process a query, streaming the answer as it is generated.
+
+    Yields {"type": "delta", "text": ...} events as answer tokens arrive,
+    then one {"type": "response", "data": ...} event whose payload matches
+    aprocess_query's return shape. An exact-cache hit skips generation and
+    yields only the final event; completed streams populate the exact
+    cache so later non-streaming repeats hit it too.
+
+    Args:
+        query_text: The user's query
+        document_id: ID of the document to query against
+        top_k: Number of top results to retrieve
+    """
+    cache_key = (query_text, document_id, top_k)
+    cached = _query_cache_get(cache_key)
+    if cached is not None:
+        yield {"type": "response", "data": cached}
+        return
+
+    start_time = time.perf_counter_ns()
+    similarity_search_time = time.perf_counter_ns()
+    top_results, context = await _get_query_processor().aretrieve(
+        query_text, document_id, top_k
+    )
+    search_duration_ns = time.perf_counter_ns() - similarity_search_time
+
+    from response_generator import response_generator
+
+    response_generation_time = time.perf_counter_ns()
+    if top_results:
+        structured_response = None
+        async for event in response_generator.agenerate_response_stream(
+            query_text, context, top_results, document_id
+        ):
+            if event["type"] == "delta":
+                yield event
+            else:
+                structured_response = event["data"]
+    else:
+        # Use fallback if no results were found
+        structured_response = response_generator.generate_fallback_response(
+            query=query_text
+        ).model_dump()
+        structured_response["generated_at"] = structured_response["generated_at"].isoformat()
+        structured_response["formatted_answer"] = "I couldn't find relevant information in the document to answer your question. Please try rephrasing or asking something covered in the document."
+
+    response_duration_ns = time.perf_counter_ns() - response_generation_time
+    processing_time_ns = time.perf_counter_ns() - start_time
+
+    response = {
+        "query": query_text,
+        "document_id": document_id,
+        "results": top_results,
+        "result_count": len(top_results),
+        "context": context,
+        "processing_time_ms": processing_time_ns // 1_000_000,
+        "search_time_ms": search_duration_ns // 1_000_000,
+        "response_time_ms": response_duration_ns // 1_000_000,
+        "response": structured_response
+    }
+    if _response_ok(response):
+        _query_cache_put(cache_key, response)
+    yield {"type": "response", "data": response}
\ No newline at end of file
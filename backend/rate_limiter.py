@@ -0,0 +1,110 @@
+"""
+Proactive rate limiting for OpenAI calls.
+
+The SDK's exponential backoff only reacts after a 429 has already cost a
+round trip, so bursts of concurrent generations waste wall-clock time in
+retry ping-pong. This module paces request issuance against per-minute
+request and token budgets with a token bucket: callers acquire capacity
+before issuing a call, bursts queue locally for exactly as long as the
+budget requires, and actual usage reported by the API reconciles the
+pre-call estimate afterwards.
+"""
+
+import os
+import time
+import asyncio
+import threading
+
+# Per-minute budgets; set these to the account's published limits for the
+# model in use. Defaults are deliberately conservative tier-1 values.
+OPENAI_RPM_LIMIT = int(os.getenv("OPENAI_RPM_LIMIT", "500"))
+OPENAI_TPM_LIMIT = int(os.getenv("OPENAI_TPM_LIMIT", "200000"))
+
+
+def estimate_tokens(*texts: str) -> int:
+    """Rough prompt-token estimate at ~4 characters per token."""
+    return sum(len(text) for text in texts) // 4
+
+
+class RateLimiter:
+    """Token bucket tracking request-per-minute and token-per-minute budgets.
+
+    Capacity replenishes continuously at the per-minute rate rather than in
+    whole-minute steps, so issuance stays smooth instead of bursting at
+    window boundaries. Both sync and async callers share one bucket.
+    """
+
+    def __init__(self, rpm: int = OPENAI_RPM_LIMIT, tpm: int = OPENAI_TPM_LIMIT):
+        """
+        Initialize the limiter with full capacity.
+
+        Args:
+            rpm: Requests-per-minute budget
+            tpm: Tokens-per-minute budget
+        """
+        self.rpm = rpm
+        self.tpm = tpm
+        self._request_capacity = float(rpm)
+        self._token_capacity = float(tpm)
+        self._last_replenish = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _replenish(self) -> None:
+        """Top up both buckets for the time elapsed since the last check."""
+        now = time.monotonic()
+        elapsed = now - self._last_replenish
+        self._last_replenish = now
+        self._request_capacity = min(
+            float(self.rpm), self._request_capacity + elapsed * self.rpm / 60.0)
+        self._token_capacity = min(
+            float(self.tpm), self._token_capacity + elapsed * self.tpm / 60.0)
+
+    def _try_acquire(self, est_tokens: int) -> float:
+        """Take capacity if available; otherwise return the wait in seconds."""
+        with self._lock:
+            self._replenish()
+            if self._request_capacity >= 1.0 and self._token_capacity >= est_tokens:
+                self._request_capacity -= 1.0
+                self._token_capacity -= est_tokens
+                return 0.0
+
+            request_wait = (
+                (1.0 - self._request_capacity) * 60.0 / self.rpm
+                if self._request_capacity < 1.0 else 0.0
+            )
+            token_wait = (
+                (est_tokens - self._token_capacity) * 60.0 / self.tpm
+                if self._token_capacity < est_tokens else 0.0
+            )
+            # Never spin: wait at least a tick even when the math rounds to 0
+            return max(request_wait, token_wait, 0.01)
+
+    def acquire(self, est_tokens: int) -> None:
+        """Block until one request plus est_tokens of budget are available."""
+        while True:
+            wait = self._try_acquire(est_tokens)
+            if wait == 0.0:
+                return
+            time.sleep(wait)
+
+    async def aacquire(self, est_tokens: int) -> None:
+        """Async variant of acquire; sleeps on the event loop while waiting."""
+        while True:
+            wait = self._try_acquire(est_tokens)
+            if wait == 0.0:
+                return
+            await asyncio.sleep(wait)
+
+    def record_usage(self, est_tokens: int, actual_tokens: int) -> None:
+        """
+        Reconcile a pre-call estimate with the usage the API reported.
+
+        Underestimates push the token bucket further down (possibly below
+        zero, delaying the next issuance); overestimates hand capacity back.
+        """
+        with self._lock:
+            self._token_capacity -= actual_tokens - est_tokens
+
+
+# Bucket shared by every OpenAI completion call in the process
+openai_rate_limiter = RateLimiter()
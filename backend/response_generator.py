@@ -8,15 +8,24 @@ This module handles:
 4. Fallback handling when context is insufficient
 """
 
+import asyncio
 import logging
 import json
-from typing import List, Dict, Any, Optional, Literal, Union
+import re
+import numpy as np
+from functools import cached_property, lru_cache
+from typing import List, Dict, Any, Optional, Literal, Tuple, Union
 from datetime import datetime
-from pydantic import BaseModel, Field
-from openai import OpenAI
+from pydantic import BaseModel, ConfigDict, Field
+from openai import OpenAI, AsyncOpenAI
+import httpx
 import os
 from dotenv import load_dotenv
 
+import tiktoken
+
+from rate_limiter import openai_rate_limiter, estimate_tokens
+
 # Load environment variables
 load_dotenv()
 
@@ -24,12 +33,60 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("response_generator")
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Initialize OpenAI clients; the async client lets the event loop hold many
+# completions in flight without tying up a worker thread per request.
+# httpx's default pool (10 keepalive connections) throttles concurrent
+# serving, so both clients get a widened pool with HTTP/2, which
+# multiplexes in-flight requests over one TCP+TLS handshake.
+_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=100, max_connections=200)
+_HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+client = OpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    http_client=httpx.Client(http2=True, limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT)
+)
+async_client = AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    http_client=httpx.AsyncClient(http2=True, limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT)
+)
+
+# Token budget for the context portion of the prompt; context beyond this
+# is trimmed lowest-relevance-first before the completion call
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+
+
+@lru_cache(maxsize=8)
+def _model_encoding(model_name: str):
+    """Tokenizer for a model, or None when no encoding can be loaded.
+
+    tiktoken fetches its BPE tables on first use; offline environments
+    fall back to the ~4-chars-per-token estimate used by the rate limiter.
+    """
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except Exception:
+        pass
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"Could not load tokenizer for {model_name}: {e}")
+        return None
+
+
+def _count_tokens(text: str, model_name: str) -> int:
+    """Count prompt tokens exactly when a tokenizer is available."""
+    encoding = _model_encoding(model_name)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text))
+
 
 # Define query types
 class QueryType(BaseModel):
     """Classification of query types"""
+    # Frozen models skip __dict__ mutation plumbing and let pydantic reuse
+    # its precompiled Rust validators without per-instance state
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     type: Literal["factual", "explanation", "summary", "analysis", "other"] = Field(
         ..., 
         description="The type of query being asked"
@@ -45,9 +102,21 @@ class QueryType(BaseModel):
         description="Brief explanation for why this classification was chosen"
     )
 
+# Wire schema for the fused classification+answer completion; the SDK's
+# structured-output parse validates straight into this model
+class CombinedResponse(BaseModel):
+    """Classification and answer returned together by one completion"""
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
+    query_type: QueryType = Field(..., description="Classification of the query type")
+    answer: str = Field(..., description="Answer to the user's question")
+
+
 # Define source reference structure
 class SourceReference(BaseModel):
     """Reference to a source in the document"""
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     page_number: int = Field(..., description="Page number where the information was found")
     text_snippet: str = Field(..., description="Short snippet of relevant text from the source")
     relevance: float = Field(
@@ -57,9 +126,22 @@ class SourceReference(BaseModel):
         le=1.0
     )
 
+    @cached_property
+    def _citation_tokens(self) -> Tuple[str, ...]:
+        """Snippet tokens long enough to anchor an inline citation.
+
+        Computed once per source; the snippet never changes (the model is
+        frozen), so formatting an answer repeatedly skips the re-split.
+        """
+        return tuple(dict.fromkeys(
+            token for token in self.text_snippet.split() if len(token) > 4
+        ))
+
 # Define the response structure
 class GeneratedResponse(BaseModel):
     """Structured response to a user query"""
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     answer: str = Field(
         ..., 
         description="Comprehensive answer to the user's question based on document context"
@@ -89,41 +171,114 @@ class GeneratedResponse(BaseModel):
     
     def format_with_citations(self) -> str:
         """Format the answer with inline citations"""
-        answer_with_citations = self.answer
-        
-        # Add footnotes for sources
+        answer = self.answer
+
+        # Collect footnotes and the snippet tokens eligible to anchor each
+        # missing citation; tokens map back to the sources that want them
         footnotes = []
+        pending: Dict[str, List[int]] = {}
         for i, source in enumerate(self.sources, 1):
-            footnote = f"[{i}] Page {source.page_number}: \"{source.text_snippet}\""
-            footnotes.append(footnote)
-            
+            footnotes.append(f"[{i}] Page {source.page_number}: \"{source.text_snippet}\"")
+
             # Add citation number in the answer if not already present
-            if f"[{i}]" not in answer_with_citations:
-                # Attempt to find a relevant point to insert the citation
-                for snippet_part in source.text_snippet.split():
-                    if len(snippet_part) > 4 and snippet_part in answer_with_citations:
-                        # Insert after this part of text
-                        position = answer_with_citations.find(snippet_part) + len(snippet_part)
-                        answer_with_citations = (
-                            answer_with_citations[:position] + 
-                            f" [{i}]" + 
-                            answer_with_citations[position:]
-                        )
-                        break
-        
+            if f"[{i}]" in answer:
+                continue
+            for snippet_part in source._citation_tokens:
+                pending.setdefault(snippet_part, []).append(i)
+
+        # One alternation scan over the answer locates every candidate
+        # token, replacing the per-token in/find double scans (and the
+        # full string rebuild per insertion) with a single linear pass
+        placements: Dict[int, int] = {}
+        if pending:
+            pattern = re.compile("|".join(
+                re.escape(token)
+                for token in sorted(pending, key=len, reverse=True)
+            ))
+            for match in pattern.finditer(answer):
+                for i in pending.pop(match.group(), ()):
+                    placements.setdefault(i, match.end())
+                if not pending:
+                    break
+
+        if placements:
+            # Rebuild the annotated answer with one join
+            pieces = []
+            last = 0
+            for position, i in sorted((pos, i) for i, pos in placements.items()):
+                pieces.append(answer[last:position])
+                pieces.append(f" [{i}]")
+                last = position
+            pieces.append(answer[last:])
+            answer = "".join(pieces)
+
         # Append footnotes
         if footnotes:
-            answer_with_citations += "\n\n**Sources:**\n" + "\n".join(footnotes)
-            
+            answer += "\n\n**Sources:**\n" + "\n".join(footnotes)
+
         # Add confidence information
-        answer_with_citations += f"\n\nConfidence: {self.confidence:.2f}"
-        
-        return answer_with_citations
+        answer += f"\n\nConfidence: {self.confidence:.2f}"
+
+        return answer
 
 
 class ResponseGenerator:
     """Handles generation of structured responses using Pydantic AI"""
-    
+
+    # Per-type answering guidance. Embedded into one combined prompt so the
+    # model classifies the query and answers it in a single round trip
+    # instead of two sequential network calls.
+    TYPE_GUIDANCE = {
+        "factual": "Provide factual information and cite specific facts with numbers. "
+                   "If the context doesn't contain the information needed, acknowledge the limitations.",
+
+        "explanation": "Give clear, structured explanations. "
+                       "Use analogies when helpful for complex concepts.",
+
+        "summary": "Provide a concise summary. "
+                   "Structure your summary with bullet points for key points.",
+
+        "analysis": "Provide thoughtful analysis. "
+                    "Consider different perspectives and implications in your analysis.",
+
+        "other": "Be helpful and informative in your response."
+    }
+
+    COMBINED_SYSTEM_PROMPT = (
+        "You are a research assistant that answers questions about documents.\n"
+        "Answer based ONLY on the provided context.\n\n"
+        "First classify the question as one of: factual (seeking factual information or data), "
+        "explanation (seeking explanations of concepts or processes), "
+        "summary (asking for summaries of content), "
+        "analysis (requiring analysis or interpretation), "
+        "or other.\n"
+        "Then answer it following the guidance for that type:\n"
+        + "\n".join(f"- {t}: {g}" for t, g in TYPE_GUIDANCE.items())
+        + "\n\nYour response should be in JSON format with these fields:\n"
+        "{\n"
+        '    "query_type": {\n'
+        '        "type": "one of [factual, explanation, summary, analysis, other]",\n'
+        '        "confidence": "a float between 0 and 1",\n'
+        '        "reasoning": "brief explanation for the classification"\n'
+        "    },\n"
+        '    "answer": "your answer to the question"\n'
+        "}"
+    )
+
+    # Plain-text prompt for the streaming path: JSON mode would stream
+    # payload syntax instead of readable answer tokens, so the streamed
+    # answer uses the generic guidance and classification runs alongside
+    STREAM_SYSTEM_PROMPT = (
+        "You are a research assistant that answers questions about documents.\n"
+        "Answer based ONLY on the provided context.\n"
+        "Be helpful and informative in your response."
+    )
+
+    # System message dicts built once at class definition; per call only
+    # the user message is allocated
+    COMBINED_SYSTEM_MESSAGE = {"role": "system", "content": COMBINED_SYSTEM_PROMPT}
+    STREAM_SYSTEM_MESSAGE = {"role": "system", "content": STREAM_SYSTEM_PROMPT}
+
     def __init__(self, model_name: str = "gpt-4o-mini"):
         """
         Initialize the response generator.
@@ -135,65 +290,31 @@ class ResponseGenerator:
         
     def _classify_query_type(self, query: str) -> QueryType:
         """
-        Classify the type of query being asked.
-        
+        Classify the type of query being asked, memoized per (model, query).
+
         Args:
             query: The user's query
-            
+
         Returns:
-            QueryType classification
+            QueryType classification, defaulting to a low-confidence
+            "other" when the classification call fails
         """
         try:
-            system_prompt = """
-            You are a query classifier that categorizes questions into different types:
-            - factual: Questions seeking factual information or data
-            - explanation: Questions seeking explanations of concepts or processes
-            - summary: Questions asking for summaries of content
-            - analysis: Questions requiring analysis or interpretation
-            - other: Questions that don't fit into the above categories
-            
-            Your response should be in JSON format with these fields:
-            {
-                "type": "one of [factual, explanation, summary, analysis, other]",
-                "confidence": "a float between 0 and 1",
-                "reasoning": "brief explanation for the classification"
-            }
-            """
-            
-            response = client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Classify the following query: \"{query}\""}
-                ],
-                temperature=0.3,
-                response_format={"type": "json_object"}  # Request JSON response
-            )
-            
-            # Parse the response text into JSON
-            response_text = response.choices[0].message.content
-            response_json = json.loads(response_text)
-            
-            # Create and return a QueryType model
-            return QueryType(
-                type=response_json.get("type", "other"),
-                confidence=response_json.get("confidence", 0.5),
-                reasoning=response_json.get("reasoning", "No reasoning provided")
-            )
-            
+            return _cached_query_classification(self.model_name, query)
         except Exception as e:
+            # The fallback lives out here so a transient API error is never
+            # memoized as this query's classification
             logger.error(f"Error classifying query: {e}")
-            # Default to "other" with low confidence if classification fails
             return QueryType(
                 type="other",
                 confidence=0.5,
                 reasoning="Failed to classify due to an error"
             )
-    
+
     def _extract_source_references(self, context: str, query: str, results: List[Dict[str, Any]]) -> List[SourceReference]:
         """
         Extract source references from the context and search results.
-        
+
         Args:
             context: The compiled context from retrieved chunks
             query: The user's query
@@ -202,32 +323,35 @@ class ResponseGenerator:
         Returns:
             List of SourceReference objects
         """
-        sources = []
-        
-        # Extract sources from results
-        for result in results:
-            metadata = result.get("metadata", {})
-            text = metadata.get("text", "")
-            page_number = metadata.get("page_number", 0)
-            relevance = result.get("score", 0.5)
-            
-            # If the text is too long, extract a shorter snippet
-            if len(text) > 150:
-                text = text[:147] + "..."
-                
-            sources.append(
-                SourceReference(
-                    page_number=page_number,
-                    text_snippet=text,
-                    relevance=relevance
-                )
+        if not results:
+            return []
+
+        # Select the top 3 scores with an O(n) argpartition instead of a
+        # full sort, and only build SourceReference models for those three
+        # — model validation per result was the dominant cost here
+        scores = np.fromiter(
+            (result.get("score", 0.5) for result in results),
+            dtype=np.float32, count=len(results)
+        )
+        keep = min(3, len(results))
+        top = np.argpartition(-scores, keep - 1)[:keep]
+        top = top[np.argsort(-scores[top])]
+
+        return [
+            SourceReference(
+                page_number=(results[i].get("metadata") or {}).get("page_number", 0),
+                text_snippet=self._truncate_snippet((results[i].get("metadata") or {}).get("text", "")),
+                relevance=float(scores[i])
             )
-        
-        # Sort sources by relevance (highest first)
-        sources.sort(key=lambda x: x.relevance, reverse=True)
-        
-        # Return top 3 most relevant sources
-        return sources[:3]
+            for i in top
+        ]
+
+    @staticmethod
+    def _truncate_snippet(text: str) -> str:
+        """Shorten a source text to a citation-sized snippet."""
+        if len(text) > 150:
+            return text[:147] + "..."
+        return text
     
     def generate_response(
         self, 
@@ -248,106 +372,295 @@ class ResponseGenerator:
         Returns:
             GeneratedResponse object
         """
-        # Classify the query type
-        query_type = self._classify_query_type(query)
-        
         # Extract source references
         sources = self._extract_source_references(context, query, results)
-        
+
         # Determine if we have sufficient context
         has_sufficient_context = len(results) > 0 and results[0].get("score", 0) > 0.7
-        
-        # Create different system prompts based on query type
-        system_prompts = {
-            "factual": """You are a research assistant that provides factual information from documents.
-                      Answer the question based ONLY on the provided context. Cite specific facts with numbers.
-                      If the context doesn't contain the information needed, acknowledge the limitations.""",
-            
-            "explanation": """You are a research assistant that explains concepts found in documents.
-                         Give clear, structured explanations based ONLY on the provided context.
-                         Use analogies when helpful for complex concepts.""",
-            
-            "summary": """You are a research assistant that summarizes information from documents.
-                      Provide concise summaries based ONLY on the provided context.
-                      Structure your summary with bullet points for key points.""",
-            
-            "analysis": """You are a research assistant that analyzes information from documents.
-                       Provide thoughtful analysis based ONLY on the provided context.
-                       Consider different perspectives and implications in your analysis.""",
-            
-            "other": """You are a research assistant that answers questions about documents.
-                    Answer based ONLY on the provided context. 
-                    Be helpful and informative in your response."""
-        }
-        
-        # Select the appropriate system prompt
-        system_prompt = system_prompts.get(query_type.type, system_prompts["other"])
-        
-        # Prepare the user prompt with context
-        user_prompt = f"""
-        Question: {query}
-        
-        Context from document:
-        {context}
-        
-        Please answer the question based solely on the provided context.
+
+        # Prepare the user prompt with the budget-trimmed context
+        user_prompt = self._build_user_prompt(query, self._budget_context(context, results))
+
+        try:
+            # Pace issuance against the RPM/TPM budgets before the call,
+            # with generation headroom on top of the prompt estimate
+            est_tokens = estimate_tokens(self.COMBINED_SYSTEM_PROMPT, user_prompt) + 800
+            openai_rate_limiter.acquire(est_tokens)
+
+            # One structured-output call classifies the query and generates
+            # the answer together; the SDK validates the payload straight
+            # into CombinedResponse, so there is no intermediate dict or
+            # silent fall-through to field defaults
+            completion = client.chat.completions.parse(
+                model=self.model_name,
+                messages=[
+                    self.COMBINED_SYSTEM_MESSAGE,
+                    {"role": "user", "content": user_prompt}
+                ],
+                temperature=0.2,  # Lower temperature for more factual responses
+                max_tokens=800,
+                response_format=CombinedResponse
+            )
+            if completion.usage:
+                openai_rate_limiter.record_usage(est_tokens, completion.usage.total_tokens)
+
+            return self._from_combined(
+                completion.choices[0].message.parsed,
+                sources, has_sufficient_context
+            )
+
+        except Exception as e:
+            return self._error_response(e, sources)
+
+    async def agenerate_response(
+        self,
+        query: str,
+        context: str,
+        results: List[Dict[str, Any]],
+        document_id: str
+    ) -> GeneratedResponse:
         """
-        
+        Async variant of generate_response using the AsyncOpenAI client.
+
+        The completion is awaited on the event loop, so a server can hold
+        many generations in flight without dedicating a worker thread to
+        each; everything around the call is pure Python and shared with
+        the sync path.
+
+        Args:
+            query: The user's query
+            context: The compiled context from retrieved chunks
+            results: The raw results from vector search
+            document_id: ID of the document being queried
+
+        Returns:
+            GeneratedResponse object
+        """
+        sources = self._extract_source_references(context, query, results)
+        has_sufficient_context = len(results) > 0 and results[0].get("score", 0) > 0.7
+        user_prompt = self._build_user_prompt(query, self._budget_context(context, results))
+
         try:
-            # Generate answer using OpenAI
-            completion = client.chat.completions.create(
+            est_tokens = estimate_tokens(self.COMBINED_SYSTEM_PROMPT, user_prompt) + 800
+            await openai_rate_limiter.aacquire(est_tokens)
+
+            completion = await async_client.chat.completions.parse(
                 model=self.model_name,
                 messages=[
-                    {"role": "system", "content": system_prompt},
+                    self.COMBINED_SYSTEM_MESSAGE,
                     {"role": "user", "content": user_prompt}
                 ],
                 temperature=0.2,  # Lower temperature for more factual responses
-                max_tokens=800
+                max_tokens=800,
+                response_format=CombinedResponse
             )
-            
-            answer = completion.choices[0].message.content
-            
-            # Calculate confidence based on result scores and answer
-            if not has_sufficient_context:
-                confidence = 0.3  # Low confidence if context is insufficient
-            elif query_type.confidence < 0.7:
-                confidence = 0.5  # Medium confidence if query type is uncertain
-            else:
-                # Calculate from source relevances
-                relevances = [source.relevance for source in sources]
-                confidence = sum(relevances) / len(relevances) if relevances else 0.5
-                
-            # Create structured response
+            if completion.usage:
+                openai_rate_limiter.record_usage(est_tokens, completion.usage.total_tokens)
+
+            return self._from_combined(
+                completion.choices[0].message.parsed,
+                sources, has_sufficient_context
+            )
+
+        except Exception as e:
+            return self._error_response(e, sources)
+
+    async def agenerate_response_stream(
+        self,
+        query: str,
+        context: str,
+        results: List[Dict[str, Any]],
+        document_id: str
+    ):
+        """
+        Stream the answer for a query as it is generated.
+
+        Yields {"type": "delta", "text": ...} events for each token chunk
+        the model produces, then one final {"type": "response", "data": ...}
+        event carrying the full structured response dict. Time-to-first-
+        token is the first network packet rather than the whole
+        generation, and classification runs concurrently in a worker
+        thread (memoized) while the stream is consumed.
+
+        Args:
+            query: The user's query
+            context: The compiled context from retrieved chunks
+            results: The raw results from vector search
+            document_id: ID of the document being queried
+        """
+        classify_task = asyncio.create_task(
+            asyncio.to_thread(self._classify_query_type, query)
+        )
+        sources = self._extract_source_references(context, query, results)
+        has_sufficient_context = len(results) > 0 and results[0].get("score", 0) > 0.7
+
+        try:
+            user_prompt = self._build_user_prompt(query, self._budget_context(context, results))
+            # Streamed responses report no usage, so the estimate stands
+            await openai_rate_limiter.aacquire(
+                estimate_tokens(self.STREAM_SYSTEM_PROMPT, user_prompt) + 800)
+
+            stream = await async_client.chat.completions.create(
+                model=self.model_name,
+                messages=[
+                    self.STREAM_SYSTEM_MESSAGE,
+                    {"role": "user", "content": user_prompt}
+                ],
+                temperature=0.2,  # Lower temperature for more factual responses
+                max_tokens=800,
+                stream=True
+            )
+
+            parts = []
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield {"type": "delta", "text": delta}
+
+            query_type = await classify_task
             response = GeneratedResponse(
-                answer=answer,
+                answer="".join(parts),
                 query_type=query_type,
                 sources=sources,
-                confidence=confidence,
+                confidence=self._score_confidence(query_type, sources, has_sufficient_context),
                 has_sufficient_context=has_sufficient_context
             )
-            
-            return response
-            
+
         except Exception as e:
-            logger.error(f"Error generating response: {e}")
-            
-            # Fallback response when generation fails
-            sources = sources if sources else [
-                SourceReference(
-                    page_number=0, 
-                    text_snippet="Error retrieving sources", 
-                    relevance=0.0
-                )
-            ]
-            
-            return GeneratedResponse(
-                answer=f"I apologize, but I encountered an error while generating a response: {str(e)}. Please try again with a different question.",
-                query_type=query_type,
-                sources=sources,
-                confidence=0.0,
-                has_sufficient_context=False
+            classify_task.cancel()
+            response = self._error_response(e, sources)
+
+        yield {"type": "response", "data": _response_to_dict(response)}
+
+    def _budget_context(self, context: str, results: List[Dict[str, Any]]) -> str:
+        """
+        Trim the context to CONTEXT_TOKEN_BUDGET, dropping least-relevant
+        chunks first.
+
+        Context that already fits passes through untouched. Otherwise the
+        chunks are ranked by retrieval score and kept highest-first until
+        the budget runs out, then re-joined in their original order; the
+        top chunk always survives even if it alone exceeds the budget.
+        Input tokens dominate both cost and time-to-first-token, so bytes
+        trimmed here pay off on every call.
+        """
+        if _count_tokens(context, self.model_name) <= CONTEXT_TOKEN_BUDGET:
+            return context
+
+        order = sorted(
+            range(len(results)),
+            key=lambda i: results[i].get("score", 0.0),
+            reverse=True
+        )
+        kept = []
+        used = 0
+        for i in order:
+            text = (results[i].get("metadata") or {}).get("text", "")
+            if not text:
+                continue
+            cost = _count_tokens(text, self.model_name)
+            if kept and used + cost > CONTEXT_TOKEN_BUDGET:
+                break
+            kept.append(i)
+            used += cost
+
+        return "\n\n".join(
+            (results[i].get("metadata") or {}).get("text", "").strip()
+            for i in sorted(kept)
+        )
+
+    @staticmethod
+    def _build_user_prompt(query: str, context: str) -> str:
+        """Build the user prompt carrying the question and its context."""
+        return f"""
+        Question: {query}
+
+        Context from document:
+        {context}
+
+        Please answer the question based solely on the provided context.
+        """
+
+    def _build_structured_response(self, content: str, sources: List[SourceReference],
+                                   has_sufficient_context: bool) -> GeneratedResponse:
+        """Parse a fused JSON payload string into a GeneratedResponse.
+
+        Lenient counterpart of _from_combined for payloads that arrive as
+        raw text (Batch API output lines) rather than SDK-parsed models.
+        """
+        payload = json.loads(content)
+        type_json = payload.get("query_type") or {}
+        type_value = type_json.get("type", "other")
+        if type_value not in self.TYPE_GUIDANCE:
+            type_value = "other"
+        combined = CombinedResponse(
+            query_type=QueryType(
+                type=type_value,
+                confidence=type_json.get("confidence", 0.5),
+                reasoning=type_json.get("reasoning", "No reasoning provided")
+            ),
+            answer=payload.get("answer", "")
+        )
+        return self._from_combined(combined, sources, has_sufficient_context)
+
+    def _from_combined(self, combined: Optional[CombinedResponse],
+                       sources: List[SourceReference],
+                       has_sufficient_context: bool) -> GeneratedResponse:
+        """Assemble a GeneratedResponse around a parsed combined payload."""
+        if combined is None:
+            # The model refused or the payload failed schema validation
+            raise ValueError("Completion returned no parsed payload")
+
+        return GeneratedResponse(
+            answer=combined.answer,
+            query_type=combined.query_type,
+            sources=sources,
+            confidence=self._score_confidence(combined.query_type, sources, has_sufficient_context),
+            has_sufficient_context=has_sufficient_context
+        )
+
+    @staticmethod
+    def _score_confidence(query_type: QueryType, sources: List[SourceReference],
+                          has_sufficient_context: bool) -> float:
+        """Calculate answer confidence from context quality and source relevances."""
+        if not has_sufficient_context:
+            return 0.3  # Low confidence if context is insufficient
+        if query_type.confidence < 0.7:
+            return 0.5  # Medium confidence if query type is uncertain
+        # Calculate from source relevances
+        relevances = [source.relevance for source in sources]
+        return sum(relevances) / len(relevances) if relevances else 0.5
+
+    @staticmethod
+    def _error_response(error: Exception, sources: List[SourceReference]) -> GeneratedResponse:
+        """Build the fallback response returned when generation fails."""
+        logger.error(f"Error generating response: {error}")
+
+        # The fused call failed before a classification could be parsed
+        query_type = QueryType(
+            type="other",
+            confidence=0.5,
+            reasoning="Failed to classify due to an error"
+        )
+
+        # Fallback response when generation fails
+        sources = sources if sources else [
+            SourceReference(
+                page_number=0,
+                text_snippet="Error retrieving sources",
+                relevance=0.0
             )
-            
+        ]
+
+        return GeneratedResponse(
+            answer=f"I apologize, but I encountered an error while generating a response: {str(error)}. Please try again with a different question.",
+            query_type=query_type,
+            sources=sources,
+            confidence=0.0,
+            has_sufficient_context=False
+        )
+
     def generate_fallback_response(self, query: str) -> GeneratedResponse:
         """
         Generate a fallback response when no relevant context is found.
@@ -374,6 +687,61 @@ class ResponseGenerator:
             has_sufficient_context=False
         )
 
+# Static classification prompt, built once at import instead of per call
+_CLASSIFY_SYSTEM_PROMPT = """
+You are a query classifier that categorizes questions into different types:
+- factual: Questions seeking factual information or data
+- explanation: Questions seeking explanations of concepts or processes
+- summary: Questions asking for summaries of content
+- analysis: Questions requiring analysis or interpretation
+- other: Questions that don't fit into the above categories
+
+Your response should be in JSON format with these fields:
+{
+    "type": "one of [factual, explanation, summary, analysis, other]",
+    "confidence": "a float between 0 and 1",
+    "reasoning": "brief explanation for the classification"
+}
+"""
+_CLASSIFY_SYSTEM_MESSAGE = {"role": "system", "content": _CLASSIFY_SYSTEM_PROMPT}
+
+
+@lru_cache(maxsize=4096)
+def _cached_query_classification(model_name: str, query: str) -> QueryType:
+    """
+    Classify a query with an exact-match LRU in front of the API call.
+
+    Identical queries (reloads, retries, test runs) otherwise re-pay a
+    full completion round trip for a deterministic-enough answer. Keyed
+    on (model, query) so generators with different models don't share
+    entries. Errors propagate to the caller: lru_cache does not memoize
+    raised exceptions, so a transient API failure never pins a bogus
+    classification for the life of the process.
+    """
+    est_tokens = estimate_tokens(_CLASSIFY_SYSTEM_PROMPT, query) + 300
+    openai_rate_limiter.acquire(est_tokens)
+
+    # Structured output validates directly into QueryType — no
+    # intermediate json.loads or hand-rolled field defaults
+    response = client.chat.completions.parse(
+        model=model_name,
+        messages=[
+            _CLASSIFY_SYSTEM_MESSAGE,
+            {"role": "user", "content": f"Classify the following query: \"{query}\""}
+        ],
+        temperature=0.3,
+        response_format=QueryType
+    )
+
+    if response.usage:
+        openai_rate_limiter.record_usage(est_tokens, response.usage.total_tokens)
+
+    parsed = response.choices[0].message.parsed
+    if parsed is None:
+        raise ValueError("Classification returned no parsed payload")
+    return parsed
+
+
 # Create a singleton instance
 response_generator = ResponseGenerator()
 
@@ -397,14 +765,134 @@ def generate_response(
         Dict containing the structured response as a dictionary
     """
     response = response_generator.generate_response(query, context, results, document_id)
-    
-    # Convert to dictionary for easier JSON serialization
-    response_dict = response.model_dump()
-    
-    # Format datetime to string
-    response_dict["generated_at"] = response_dict["generated_at"].isoformat()
-    
+    return _response_to_dict(response)
+
+
+async def agenerate_response(
+    query: str,
+    context: str,
+    results: List[Dict[str, Any]],
+    document_id: str
+) -> Dict[str, Any]:
+    """
+    Async convenience function to generate a response.
+
+    Awaits the completion on the event loop instead of blocking a worker
+    thread, so concurrent queries share one connection pool.
+
+    Args:
+        query: The user's query
+        context: The compiled context from retrieved chunks
+        results: The raw results from vector search
+        document_id: ID of the document being queried
+
+    Returns:
+        Dict containing the structured response as a dictionary
+    """
+    response = await response_generator.agenerate_response(query, context, results, document_id)
+    return _response_to_dict(response)
+
+
+async def submit_batch(queries: List[Tuple[str, str, List[Dict[str, Any]], str]],
+                       model_name: str = "gpt-4o-mini") -> str:
+    """
+    Submit a bulk set of queries through the OpenAI Batch API.
+
+    Offline workloads — eval runs, backlogs of questions, re-answering
+    after re-indexing — don't need online latency; the Batch API trades a
+    completion window of up to 24 h for half the per-token cost and zero
+    pressure on the online rate limits. Each query reuses the fused
+    classification+answer prompt, so one batch line yields one full
+    structured response.
+
+    Args:
+        queries: List of (query, context, results, document_id) tuples
+        model_name: Chat model for the batched completions
+
+    Returns:
+        The OpenAI batch id, to be polled with poll_batch
+    """
+    lines = []
+    for i, (query, context, _results, _document_id) in enumerate(queries):
+        lines.append(json.dumps({
+            "custom_id": f"q{i}",
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": model_name,
+                "messages": [
+                    {"role": "system", "content": ResponseGenerator.COMBINED_SYSTEM_PROMPT},
+                    {"role": "user", "content": ResponseGenerator._build_user_prompt(query, context)}
+                ],
+                "temperature": 0.2,
+                "max_tokens": 800,
+                "response_format": {"type": "json_object"}
+            }
+        }))
+
+    batch_file = await async_client.files.create(
+        file=("batch.jsonl", "\n".join(lines).encode("utf-8")),
+        purpose="batch"
+    )
+    batch = await async_client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h"
+    )
+    logger.info(f"Submitted batch {batch.id} with {len(queries)} queries")
+    return batch.id
+
+
+async def poll_batch(batch_id: str) -> Optional[Dict[str, GeneratedResponse]]:
+    """
+    Check a batch and collect its responses once it has completed.
+
+    Returns None while the batch is still in flight. On completion,
+    returns a dict mapping each custom_id to a GeneratedResponse parsed
+    with the same fused schema as the online path. Source references are
+    not reconstructed offline (the retrieval results are not persisted
+    across the completion window), so sources are empty and confidence
+    is scored accordingly.
+
+    Args:
+        batch_id: Batch id returned by submit_batch
+
+    Returns:
+        Dict of custom_id to GeneratedResponse, or None if not finished
+
+    Raises:
+        RuntimeError: If the batch ended in a terminal failure state
+    """
+    batch = await async_client.batches.retrieve(batch_id)
+    if batch.status in ("failed", "expired", "cancelled"):
+        raise RuntimeError(f"Batch {batch_id} ended in status {batch.status}")
+    if batch.status != "completed":
+        return None
+
+    output = await async_client.files.content(batch.output_file_id)
+    responses: Dict[str, GeneratedResponse] = {}
+    for line in output.text.splitlines():
+        if not line.strip():
+            continue
+        row = json.loads(line)
+        custom_id = row.get("custom_id")
+        try:
+            content = row["response"]["body"]["choices"][0]["message"]["content"]
+            responses[custom_id] = response_generator._build_structured_response(
+                content, [], False
+            )
+        except Exception as e:
+            logger.error(f"Error parsing batch result for {custom_id}: {e}")
+    return responses
+
+
+def _response_to_dict(response: GeneratedResponse) -> Dict[str, Any]:
+    """Convert a GeneratedResponse into a JSON-serializable dict."""
+    # mode="json" serializes the datetime to an ISO string inside the
+    # precompiled Rust serializer instead of a Python-side isoformat pass
+    response_dict = response.model_dump(mode="json")
+
     # Add formatted answer with citations
     response_dict["formatted_answer"] = response.format_with_citations()
-    
-    return response_dict 
\ No newline at end of file
+
+    return response_dict
\ No newline at end of file
@@ -0,0 +1,63 @@
+"""
+Vectorized similarity scoring helpers.
+
+Retrieval itself runs server-side in Pinecone, but any client-side
+re-ranking (MMR, diversity filtering, semantic-cache refinement) needs to
+score one query vector against a candidate matrix without falling back to a
+Python loop. cosine_batch does the whole batch as a single BLAS call, and
+dispatches to simsimd's SIMD kernels when that package happens to be
+installed.
+"""
+
+from typing import List, Union
+
+import numpy as np
+
+try:
+    import simsimd
+except ImportError:  # Optional accelerator; numpy BLAS path is the default
+    simsimd = None
+
+
+def half(matrix: Union[List[List[float]], np.ndarray]) -> np.ndarray:
+    """
+    Store a candidate matrix at half precision.
+
+    Embedding components lie in [-1, 1], well inside float16 range, so
+    keeping resident candidate matrices as float16 halves their memory
+    and bandwidth at negligible similarity error; cosine_batch accepts
+    them directly.
+    """
+    return np.ascontiguousarray(matrix, dtype=np.float16)
+
+
+def cosine_batch(query: Union[List[float], np.ndarray],
+                 matrix: np.ndarray) -> np.ndarray:
+    """
+    Cosine similarity of one query vector against every row of a matrix.
+
+    Args:
+        query: Query vector of shape (d,)
+        matrix: Candidate matrix of shape (n, d), float32 or float16
+
+    Returns:
+        float32 array of shape (n,) with the cosine similarity per row
+    """
+    if simsimd is not None:
+        # simsimd has native f16 kernels, so half-precision matrices are
+        # scored without an upcast copy
+        dtype = np.float16 if matrix.dtype == np.float16 else np.float32
+        q = np.asarray(query, dtype=dtype)
+        M = np.ascontiguousarray(matrix, dtype=dtype)
+        distances = np.asarray(simsimd.cdist(q[None, :], M, "cosine"), dtype=np.float32)
+        return 1.0 - distances[0]
+
+    # BLAS path accumulates in float32 regardless of storage precision
+    q = np.asarray(query, dtype=np.float32)
+    M = np.ascontiguousarray(matrix, dtype=np.float32)
+
+    q_norm = np.linalg.norm(q)
+    row_norms = np.linalg.norm(M, axis=1)
+    # Zero vectors score 0 rather than dividing by zero
+    scale = (q_norm or 1.0) * np.where(row_norms == 0.0, 1.0, row_norms)
+    return (M @ q) / scale
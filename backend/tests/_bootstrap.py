@@ -0,0 +1,24 @@
+"""
+One-time bootstrap shared by the test modules.
+
+Puts the project root on sys.path so `backend.*` imports resolve and
+loads the .env file. Every test module used to repeat this prelude, so
+running the full suite parsed the dotenv file and walked the abspath
+chain once per file; Python's import cache guarantees this module body
+runs exactly once per process instead.
+"""
+import os
+import sys
+from pathlib import Path
+from dotenv import load_dotenv
+
+PROJECT_ROOT = Path(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+# The backend package uses flat sibling imports internally
+# (e.g. `from pdf_processing import TextChunk`), so both the project
+# root and the backend directory need to be importable
+for _path in (str(PROJECT_ROOT), str(PROJECT_ROOT / 'backend')):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+load_dotenv(PROJECT_ROOT / '.env')
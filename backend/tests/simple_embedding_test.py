@@ -6,22 +6,34 @@ Usage:
     python -m backend.tests.simple_embedding_test
 """
 import os
+import statistics
 import time
 import sys
 from pprint import pprint
-from pathlib import Path
-from dotenv import load_dotenv
 
-# Add parent directory to path to allow imports
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-
-# Load environment variables from .env file
-project_root = Path(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-dotenv_path = project_root / '.env'
-load_dotenv(dotenv_path)
+# Shared bootstrap: puts the project root on sys.path and loads .env,
+# once per process regardless of how many test modules import it
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import _bootstrap  # noqa: F401,E402
 
 from backend.embeddings import get_embedding
 
+# Cache-hit timing: iterations per measurement after a warm-up call. A
+# single timed call is dominated by timer resolution and interpreter
+# jitter, so we take the median over a batch instead.
+CACHE_TIMING_ITERATIONS = 20
+
+
+def time_cached_lookups(text: str) -> tuple:
+    """Median and minimum cache-hit latency in nanoseconds for a text."""
+    _ = get_embedding(text)  # warm up: make sure the entry is cached
+    samples = []
+    for _ in range(CACHE_TIMING_ITERATIONS):
+        start_ns = time.perf_counter_ns()
+        _ = get_embedding(text)
+        samples.append(time.perf_counter_ns() - start_ns)
+    return statistics.median(samples), min(samples)
+
 
 def main():
     """Run a simple embedding test."""
@@ -39,26 +51,33 @@ def main():
     text = "Testing OpenAI embeddings API connection."
     
     print(f"Generating embedding for: '{text}'")
-    start_time = time.time()
-    
+    start_ns = time.perf_counter_ns()
+
     try:
         # Get embedding
         embedding = get_embedding(text)
-        duration = time.time() - start_time
-        
+        cold_ns = time.perf_counter_ns() - start_ns
+
         # Output results
-        print(f"✅ Success! Embedding generated in {duration:.2f} seconds")
+        print(f"✅ Success! Embedding generated in {cold_ns / 1e9:.2f} seconds")
         print(f"Embedding dimensions: {len(embedding)}")
         print(f"First 5 values: {embedding[:5]}")
-        
-        # Test a second call to see caching in action
-        print("\nTesting cache (second call should be faster)...")
-        start_time = time.time()
-        _ = get_embedding(text)
-        cache_duration = time.time() - start_time
-        print(f"Cached result retrieved in {cache_duration:.2f} seconds")
-        print(f"Speed improvement: {duration/cache_duration:.1f}x faster")
-        
+
+        # Time cache hits over a batch of lookups; a single timed call
+        # mostly measures noise at sub-millisecond latencies
+        print(f"\nTesting cache ({CACHE_TIMING_ITERATIONS} lookups after warm-up)...")
+        median_ns, min_ns = time_cached_lookups(text)
+        print(f"Cached lookup: median {median_ns:,.0f} ns, min {min_ns:,} ns")
+        print(f"Speed improvement: {cold_ns / median_ns:.1f}x faster than cold call")
+
+        # Longer inputs exercise the cache-key hashing path; lookup time
+        # should stay flat, not grow with input length
+        print("\nCache-hit latency by input length:")
+        for multiplier in (1, 10, 100):
+            long_text = text * multiplier
+            median_ns, min_ns = time_cached_lookups(long_text)
+            print(f"  {len(long_text):>6} chars: median {median_ns:,.0f} ns, min {min_ns:,} ns")
+
     except Exception as e:
         print(f"❌ Error generating embedding: {str(e)}")
         import traceback
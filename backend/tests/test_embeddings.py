@@ -7,19 +7,14 @@ This file can be run directly:
 import os
 import unittest
 from unittest.mock import patch, MagicMock
+from types import SimpleNamespace
 import tempfile
-import shutil
 import sys
-from pathlib import Path
-from dotenv import load_dotenv
 
-# Add parent directory to path to allow direct imports
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-
-# Load environment variables from .env file
-project_root = Path(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-dotenv_path = project_root / '.env'
-load_dotenv(dotenv_path)
+# Shared bootstrap: puts the project root on sys.path and loads .env,
+# once per process regardless of how many test modules import it
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import _bootstrap  # noqa: F401,E402
 
 import numpy as np
 # Import modules but use different names to avoid import issues with patching
@@ -34,24 +29,60 @@ from backend.embeddings import (
 from backend.pdf_processing import TextChunk
 
 
+def _mock_embedding_response(*vectors):
+    """Build a stub embeddings.create response carrying the given vectors.
+
+    The response is a read-only payload — nothing asserts calls on it —
+    so plain SimpleNamespace objects suffice; MagicMock (with its lazy
+    magic methods and call-history tracking) stays on mock_client, where
+    the call assertions live.
+    """
+    return SimpleNamespace(data=[
+        SimpleNamespace(embedding=vector, index=i)
+        for i, vector in enumerate(vectors)
+    ])
+
+
 class TestEmbeddings(unittest.TestCase):
     """Test cases for the embeddings module."""
-    
-    def setUp(self):
-        """Set up test fixtures."""
-        # Create a temporary directory for the cache
-        self.temp_dir = tempfile.mkdtemp()
-        self.patcher = patch('backend.embeddings.CACHE_DIR', self.temp_dir)
-        self.patcher.start()
-        
+
+    # Immutable test data shared by every test; built once at class
+    # creation instead of reallocating 1536 floats per setUp
+    MOCK_EMBEDDING = [0.1] * 1536  # text-embedding-3-small has 1536 dimensions
+    ZERO_VEC = np.zeros(1536)
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up fixtures shared by every test.
+
+        No test writes to CACHE_DIR (they mock the client or patch the
+        in-memory cache), so one temporary directory and one CACHE_DIR
+        patcher serve the whole class instead of a mkdir/rmtree per test.
+        """
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls._cache_dir_patcher = patch('backend.embeddings.CACHE_DIR', cls._tmp.name)
+        cls._cache_dir_patcher.start()
+
         # Mock OpenAI API key for testing
-        self.original_api_key = os.environ.get("OPENAI_API_KEY")
-        if not self.original_api_key:
+        cls._original_api_key = os.environ.get("OPENAI_API_KEY")
+        if not cls._original_api_key:
             os.environ["OPENAI_API_KEY"] = "mock-api-key"
-            self.using_mock_key = True
+            cls._using_mock_key = True
         else:
-            self.using_mock_key = False
-        
+            cls._using_mock_key = False
+
+    @classmethod
+    def tearDownClass(cls):
+        """Tear down the class-level fixtures."""
+        cls._cache_dir_patcher.stop()
+        cls._tmp.cleanup()
+
+        # Restore original API key state
+        if cls._using_mock_key:
+            del os.environ["OPENAI_API_KEY"]
+
+    def setUp(self):
+        """Set up per-test sample data."""
         # Sample text for testing
         self.sample_text = "This is a sample text for embedding generation."
         self.sample_texts = [
@@ -78,18 +109,6 @@ class TestEmbeddings(unittest.TestCase):
             )
         ]
         
-        # Mock embedding
-        self.mock_embedding = [0.1] * 1536  # text-embedding-3-small has 1536 dimensions
-    
-    def tearDown(self):
-        """Tear down test fixtures."""
-        self.patcher.stop()
-        shutil.rmtree(self.temp_dir)
-        
-        # Restore original API key state
-        if self.using_mock_key:
-            del os.environ["OPENAI_API_KEY"]
-    
     # Test initialization without making API calls
     def test_embedding_generator_init(self):
         """Test initialization of EmbeddingGenerator."""
@@ -116,15 +135,9 @@ class TestEmbeddings(unittest.TestCase):
     
     def test_get_embedding_single(self):
         """Test getting a single embedding."""
-        # Create a mock for the embeddings.create method
-        mock_embedding_response = MagicMock()
-        mock_embedding_data = MagicMock()
-        mock_embedding_data.embedding = self.mock_embedding
-        mock_embedding_response.data = [mock_embedding_data]
-        
         # Create a mock for the OpenAI client
         mock_client = MagicMock()
-        mock_client.embeddings.create.return_value = mock_embedding_response
+        mock_client.embeddings.create.return_value = _mock_embedding_response(self.MOCK_EMBEDDING)
         
         # Use the patch to replace the actual OpenAI client with our mock
         with patch.object(EmbeddingGenerator, '__init__', return_value=None) as mock_init:
@@ -138,9 +151,9 @@ class TestEmbeddings(unittest.TestCase):
                 # Test the method
                 embedding = generator._get_embedding_single(self.sample_text, DEFAULT_EMBEDDING_MODEL)
                 
-                # Assertions
-                self.assertEqual(len(embedding), 1536)
-                self.assertEqual(embedding, self.mock_embedding)
+                # The mock's list comes back untouched, so identity is the
+                # exact (and O(1)) form of the 1536-element equality walk
+                self.assertIs(embedding, self.MOCK_EMBEDDING)
                 mock_client.embeddings.create.assert_called_once_with(
                     model=DEFAULT_EMBEDDING_MODEL,
                     input=self.sample_text
@@ -148,15 +161,9 @@ class TestEmbeddings(unittest.TestCase):
     
     def test_get_embedding_with_caching(self):
         """Test that caching works for embeddings."""
-        # Create a mock for the embeddings.create method
-        mock_embedding_response = MagicMock()
-        mock_embedding_data = MagicMock()
-        mock_embedding_data.embedding = self.mock_embedding
-        mock_embedding_response.data = [mock_embedding_data]
-        
         # Create a mock for the OpenAI client
         mock_client = MagicMock()
-        mock_client.embeddings.create.return_value = mock_embedding_response
+        mock_client.embeddings.create.return_value = _mock_embedding_response(self.MOCK_EMBEDDING)
         
         # Create a test cache for this test
         test_cache = {}
@@ -171,52 +178,59 @@ class TestEmbeddings(unittest.TestCase):
                         generator.model = DEFAULT_EMBEDDING_MODEL
                         generator.use_cache = True
                         
-                        # First call should hit the API
+                        # First call should hit the API and return the mock's
+                        # list as-is
                         embedding1 = generator.get_embedding(self.sample_text)
-                        self.assertEqual(embedding1, self.mock_embedding)
+                        self.assertIs(embedding1, self.MOCK_EMBEDDING)
                         mock_client.embeddings.create.assert_called_once()
                         
                         # Reset mock to verify no more calls
                         mock_client.embeddings.create.reset_mock()
-                        
-                        # Second call with same text should use cache
+
+                        # Second call with same text should use cache; the cache
+                        # stores float32 bytes, so compare with a tolerance
                         embedding2 = generator.get_embedding(self.sample_text)
-                        self.assertEqual(embedding2, self.mock_embedding)
+                        self.assertEqual(len(embedding2), len(self.MOCK_EMBEDDING))
+                        self.assertTrue(np.allclose(embedding2, self.MOCK_EMBEDDING))
                         mock_client.embeddings.create.assert_not_called()
     
     def test_get_embeddings_batch(self):
         """Test batch processing of embeddings."""
-        # Create a mock for the embeddings.create method
-        mock_embedding_response = MagicMock()
-        mock_embedding_data = MagicMock()
-        mock_embedding_data.embedding = self.mock_embedding
-        mock_embedding_response.data = [mock_embedding_data]
-        
+        # Create a mock that returns one embedding per input text, like the real API
+        def mock_create(model, input):
+            return _mock_embedding_response(*([self.MOCK_EMBEDDING] * len(input)))
+
         # Create a mock for the OpenAI client
         mock_client = MagicMock()
-        mock_client.embeddings.create.return_value = mock_embedding_response
-        
+        mock_client.embeddings.create.side_effect = mock_create
+
         # Patch the necessary components
         with patch.object(EmbeddingGenerator, '__init__', return_value=None) as mock_init:
             with patch.object(EmbeddingGenerator, 'client', mock_client, create=True):
-                with patch('time.sleep', return_value=None):  # Skip sleeps
-                    with patch('tqdm.tqdm', return_value=range(1)):  # Skip progress bar
-                        # Create generator and manually set required attributes
-                        generator = EmbeddingGenerator()
-                        generator.model = DEFAULT_EMBEDDING_MODEL
-                        generator.use_cache = False
-                        generator.batch_size = 2
-                        
-                        # Test method
-                        embeddings = generator.get_embeddings_batch(self.sample_texts)
-                        
-                        # Assertions
-                        self.assertEqual(len(embeddings), 3)
-                        for embedding in embeddings:
-                            self.assertEqual(embedding, self.mock_embedding)
-                        
-                        # Should be called once for each text
-                        self.assertEqual(mock_client.embeddings.create.call_count, 3)
+                with patch('tqdm.tqdm', return_value=range(1)):  # Skip progress bar
+                    # Create generator and manually set required attributes
+                    generator = EmbeddingGenerator()
+                    generator.model = DEFAULT_EMBEDDING_MODEL
+                    generator.use_cache = False
+                    generator.batch_size = 2
+
+                    # Test method
+                    embeddings = generator.get_embeddings_batch(self.sample_texts)
+
+                    # Assertions
+                    self.assertEqual(len(embeddings), 3)
+                    for embedding in embeddings:
+                        self.assertIs(embedding, self.MOCK_EMBEDDING)
+
+                    # Should be called once per batch (2 texts + 1 text), not
+                    # per text, with each call carrying the whole batch as a
+                    # list input
+                    self.assertEqual(mock_client.embeddings.create.call_count, 2)
+                    batch_inputs = [
+                        call.kwargs["input"]
+                        for call in mock_client.embeddings.create.call_args_list
+                    ]
+                    self.assertEqual(batch_inputs, [self.sample_texts[:2], self.sample_texts[2:]])
     
     def test_get_embeddings_for_chunks(self):
         """Test getting embeddings for TextChunk objects."""
@@ -224,7 +238,7 @@ class TestEmbeddings(unittest.TestCase):
         with patch.object(
             EmbeddingGenerator, 
             'get_embeddings_batch', 
-            return_value=[self.mock_embedding, self.mock_embedding]
+            return_value=[self.MOCK_EMBEDDING, self.MOCK_EMBEDDING]
         ) as mock_batch:
             # Create generator and test
             generator = EmbeddingGenerator()
@@ -234,8 +248,8 @@ class TestEmbeddings(unittest.TestCase):
             self.assertEqual(len(chunk_embeddings), 2)
             self.assertIn("chunk1", chunk_embeddings)
             self.assertIn("chunk2", chunk_embeddings)
-            self.assertEqual(chunk_embeddings["chunk1"], self.mock_embedding)
-            self.assertEqual(chunk_embeddings["chunk2"], self.mock_embedding)
+            self.assertIs(chunk_embeddings["chunk1"], self.MOCK_EMBEDDING)
+            self.assertIs(chunk_embeddings["chunk2"], self.MOCK_EMBEDDING)
             
             # Verify batch was called with correct texts
             mock_batch.assert_called_once_with(
@@ -258,9 +272,10 @@ class TestEmbeddings(unittest.TestCase):
                 # Test the method
                 embedding = generator._get_embedding_single("", DEFAULT_EMBEDDING_MODEL)
                 
-                # Assertions - should return zero vector
+                # Assertions - should return zero vector; the comparison
+                # runs in NumPy's C loop against the prebuilt zero vector
                 self.assertEqual(len(embedding), 1536)
-                self.assertEqual(embedding, [0.0] * 1536)
+                self.assertTrue(np.array_equal(np.asarray(embedding), self.ZERO_VEC))
                 
                 # API should not be called for empty text
                 mock_client.embeddings.create.assert_not_called()
@@ -271,11 +286,11 @@ class TestEmbeddings(unittest.TestCase):
         with patch('backend.embeddings.EmbeddingGenerator') as mock_generator_class:
             # Setup mock generator instance
             mock_generator = MagicMock()
-            mock_generator.get_embedding.return_value = self.mock_embedding
-            mock_generator.get_embeddings_batch.return_value = [self.mock_embedding] * 3
+            mock_generator.get_embedding.return_value = self.MOCK_EMBEDDING
+            mock_generator.get_embeddings_batch.return_value = [self.MOCK_EMBEDDING] * 3
             mock_generator.get_embeddings_for_chunks.return_value = {
-                "chunk1": self.mock_embedding,
-                "chunk2": self.mock_embedding
+                "chunk1": self.MOCK_EMBEDDING,
+                "chunk2": self.MOCK_EMBEDDING
             }
             mock_generator_class.return_value = mock_generator
             
@@ -285,37 +300,21 @@ class TestEmbeddings(unittest.TestCase):
             chunk_embeddings = get_embeddings_for_chunks(self.sample_chunks)
             
             # Assertions
-            self.assertEqual(embedding, self.mock_embedding)
+            self.assertEqual(embedding, self.MOCK_EMBEDDING)
             self.assertEqual(len(embeddings), 3)
             self.assertEqual(len(chunk_embeddings), 2)
 
 
-def run_tests():
-    """Run all the tests and print a summary."""
-    print("\n=== Running Embeddings Unit Tests ===\n")
-    
-    # Create a test suite
-    suite = unittest.TestSuite()
-    
-    # Add all the test methods
-    test_loader = unittest.TestLoader()
-    suite.addTest(test_loader.loadTestsFromTestCase(TestEmbeddings))
-    
-    # Run the tests
-    test_runner = unittest.TextTestRunner(verbosity=2)
-    result = test_runner.run(suite)
-    
-    # Print summary
-    print(f"\n=== Test Summary ===")
-    print(f"Tests run: {result.testsRun}")
-    print(f"Errors: {len(result.errors)}")
-    print(f"Failures: {len(result.failures)}")
-    
-    if result.wasSuccessful():
-        print("\n✅ All tests passed successfully!")
-    else:
-        print("\n❌ Some tests failed. See details above.")
-
-
 if __name__ == "__main__":
-    run_tests()
+    # Run under pytest, spread across cores when pytest-xdist is
+    # installed; every test uses its own mocked client, so workers never
+    # share state
+    import pytest
+
+    args = [__file__, "-v"]
+    try:
+        import xdist  # noqa: F401
+        args += ["-n", "auto"]
+    except ImportError:
+        pass
+    sys.exit(pytest.main(args))
@@ -6,20 +6,16 @@ Usage:
 
 Make sure you have your OpenAI API key set in the environment variable OPENAI_API_KEY.
 """
+import asyncio
 import os
 import time
 import sys
 from pprint import pprint
-from pathlib import Path
-from dotenv import load_dotenv
 
-# Add parent directory to path to allow imports
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-
-# Load environment variables from .env file
-project_root = Path(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-dotenv_path = project_root / '.env'
-load_dotenv(dotenv_path)
+# Shared bootstrap: puts the project root on sys.path and loads .env,
+# once per process regardless of how many test modules import it
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import _bootstrap  # noqa: F401,E402
 
 from backend.embeddings import (
     EmbeddingGenerator, 
@@ -136,20 +132,29 @@ def check_environment():
     return True
 
 
-def main():
-    """Run all tests."""
+async def main():
+    """Run all tests concurrently.
+
+    Each test blocks on OpenAI HTTP latency, not CPU, so they run in
+    worker threads and finish in roughly the time of the slowest call
+    instead of the sum of all of them. Output from different tests may
+    interleave; what matters for this sanity check is that every test
+    completes without raising.
+    """
     if not check_environment():
         return
-    
+
     print("=== OpenAI Embeddings Test Script ===")
     print("This script will test various functionalities of the embeddings module.")
-    
+
     try:
-        test_single_embedding()
-        test_batch_embedding()
-        test_chunk_embeddings()
-        test_custom_embedding_generator()
-        
+        await asyncio.gather(
+            asyncio.to_thread(test_single_embedding),
+            asyncio.to_thread(test_batch_embedding),
+            asyncio.to_thread(test_chunk_embeddings),
+            asyncio.to_thread(test_custom_embedding_generator)
+        )
+
         print("\n=== All Tests Completed Successfully ===")
     except Exception as e:
         print(f"\nERROR: An exception occurred: {str(e)}")
@@ -158,4 +163,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file
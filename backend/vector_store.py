@@ -10,7 +10,8 @@ This module handles:
 import os
 import time
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from datetime import datetime
 import json
 import uuid
@@ -19,7 +20,7 @@ from pinecone import Pinecone, ServerlessSpec
 from dotenv import load_dotenv
 
 from pdf_processing import TextChunk
-from embeddings import get_embedding, get_embeddings_for_chunks
+from embeddings import get_embeddings_for_chunks, get_query_embedding
 
 # Load environment variables
 load_dotenv()
@@ -34,6 +35,17 @@ PINECONE_INDEX_NAME = os.environ.get("PINECONE_INDEX_NAME", "researcheragentrag"
 PINECONE_ENVIRONMENT = os.environ.get("PINECONE_ENVIRONMENT", "gcp-starter")
 EMBEDDING_DIMENSIONS = 1536  # Dimensions for text-embedding-3-small
 
+# Parallel upsert tuning (mirrors CHUNK_SIZE-style env configuration)
+PINECONE_UPSERT_BATCH = int(os.environ.get("PINECONE_UPSERT_BATCH", "100"))
+PINECONE_POOL_THREADS = int(os.environ.get("PINECONE_POOL_THREADS", "30"))
+
+
+def _batched(iterable: Iterable[Any], batch_size: int) -> Iterator[List[Any]]:
+    """Yield successive lists of up to batch_size items from an iterable."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
 class VectorStore:
     """Class to handle Pinecone vector database operations."""
     
@@ -97,8 +109,8 @@ class VectorStore:
             else:
                 logger.info(f"Index {self.index_name} already exists")
                 
-            # Connect to the index
-            self.index = self.pc.Index(self.index_name)
+            # Connect to the index with a thread pool for parallel upserts
+            self.index = self.pc.Index(self.index_name, pool_threads=PINECONE_POOL_THREADS)
             logger.info(f"Connected to Pinecone index: {self.index_name}")
             
             # Get index stats to verify connection
@@ -109,104 +121,147 @@ class VectorStore:
             logger.error(f"Error connecting to Pinecone index: {str(e)}")
             raise
     
-    def upsert_chunks(self, chunks: List[TextChunk], namespace: Optional[str] = None) -> int:
+    def upsert_chunks(self, chunks: List[TextChunk], namespace: Optional[str] = None,
+                      embeddings: Optional[Dict[str, List[float]]] = None) -> int:
         """
-        Generate embeddings for chunks and upsert them to Pinecone.
-        
+        Upsert chunks to Pinecone, embedding them first if needed.
+
         Args:
             chunks: List of TextChunk objects to embed and store
             namespace: Optional namespace for organizing vectors
-            
+            embeddings: Optional precomputed chunk_id -> embedding mapping;
+                        when provided, no embedding API calls are made
+
         Returns:
             Number of vectors upserted
         """
         if not chunks:
             logger.warning("No chunks provided for upserting.")
             return 0
-        
+
         try:
-            # Generate embeddings for all chunks
-            logger.info(f"Generating embeddings for {len(chunks)} chunks...")
-            chunk_embeddings = get_embeddings_for_chunks(chunks)
-            
-            # Prepare vectors for upserting
-            vectors = []
-            for chunk in chunks:
-                # Skip if embedding generation failed
-                if chunk.chunk_id not in chunk_embeddings:
-                    logger.warning(f"No embedding found for chunk {chunk.chunk_id}")
-                    continue
-                
-                # Prepare metadata
-                metadata = {
-                    "text": chunk.text,
-                    "page": chunk.page_number,
-                    "document_id": chunk.document_id,
-                    "document_name": chunk.document_name,
-                    "timestamp": datetime.now().isoformat()
-                }
-                
-                # Add vector to batch
-                vectors.append({
-                    "id": chunk.chunk_id,
-                    "values": chunk_embeddings[chunk.chunk_id],
-                    "metadata": metadata
-                })
-            
-            # Upsert vectors in batches of 100
-            batch_size = 100
-            total_upserted = 0
-            
-            for i in range(0, len(vectors), batch_size):
-                batch = vectors[i:i+batch_size]
-                
-                # Upsert the batch
-                upsert_response = self.index.upsert(
-                    vectors=batch,
-                    namespace=namespace
-                )
-                
-                # Update count and add delay to avoid rate limits
-                total_upserted += upsert_response.get('upserted_count', 0)
-                if i + batch_size < len(vectors):
-                    time.sleep(0.5)  # Small delay between batches
-            
+            # Generate embeddings only when the caller didn't supply them
+            chunk_embeddings = embeddings
+            if chunk_embeddings is None:
+                logger.info(f"Generating embeddings for {len(chunks)} chunks...")
+                chunk_embeddings = get_embeddings_for_chunks(chunks)
+
+            # Prepare and upsert the vectors
+            vectors = self.prepare_vectors(chunks, chunk_embeddings)
+            return self.upsert_vectors(vectors, namespace=namespace)
+
+        except Exception as e:
+            logger.error(f"Error upserting vectors: {str(e)}")
+            raise
+
+    def prepare_vectors(self, chunks: List[TextChunk],
+                        chunk_embeddings: Dict[str, List[float]]) -> List[Dict[str, Any]]:
+        """
+        Build Pinecone vector dicts from chunks and their embeddings.
+
+        Args:
+            chunks: List of TextChunk objects
+            chunk_embeddings: Dictionary mapping chunk_id to embedding
+
+        Returns:
+            List of vector dicts ready for upserting
+        """
+        vectors = []
+        for chunk in chunks:
+            # Skip if embedding generation failed
+            if chunk.chunk_id not in chunk_embeddings:
+                logger.warning(f"No embedding found for chunk {chunk.chunk_id}")
+                continue
+
+            # Prepare metadata
+            metadata = {
+                "text": chunk.text,
+                "page": chunk.page_number,
+                "document_id": chunk.document_id,
+                "document_name": chunk.document_name,
+                "timestamp": datetime.now().isoformat()
+            }
+
+            # Add vector to batch
+            vectors.append({
+                "id": chunk.chunk_id,
+                "values": chunk_embeddings[chunk.chunk_id],
+                "metadata": metadata
+            })
+
+        return vectors
+
+    def upsert_vectors(self, vectors: List[Dict[str, Any]],
+                       namespace: Optional[str] = None) -> int:
+        """
+        Upsert prepared vectors to Pinecone in parallel batches.
+
+        Args:
+            vectors: List of vector dicts (id, values, metadata)
+            namespace: Optional namespace for organizing vectors
+
+        Returns:
+            Number of vectors upserted
+        """
+        if not vectors:
+            return 0
+
+        try:
+            # Submit all batches at once and let the index's thread pool send
+            # them in parallel, then wait for every response
+            async_results = [
+                self.index.upsert(vectors=batch, namespace=namespace, async_req=True)
+                for batch in _batched(vectors, PINECONE_UPSERT_BATCH)
+            ]
+            responses = [async_result.get() for async_result in async_results]
+            total_upserted = sum(
+                getattr(response, 'upserted_count', 0) or 0 for response in responses
+            )
+
             logger.info(f"Successfully upserted {total_upserted} vectors to namespace '{namespace}'")
             return total_upserted
-            
+
         except Exception as e:
             logger.error(f"Error upserting vectors: {str(e)}")
             raise
     
-    def query(self, 
-              query_text: str, 
+    def query(self,
+              query_text: str,
               namespace: Optional[str] = None,
               top_k: int = 5,
-              include_metadata: bool = True) -> List[Dict[str, Any]]:
+              include_metadata: bool = True,
+              query_embedding: Optional[List[float]] = None,
+              include_values: bool = False) -> List[Dict[str, Any]]:
         """
         Query the vector store for similar chunks.
-        
+
         Args:
             query_text: The query text to find similar chunks for
             namespace: Optional namespace to search in
             top_k: Number of results to return
             include_metadata: Whether to include metadata in the results
-            
+            query_embedding: Optional precomputed embedding for the query;
+                             embedded here (memoized) when not provided
+            include_values: Whether to return the stored vectors, for
+                            client-side re-ranking of the matches
+
         Returns:
             List of matching vectors with similarity scores and metadata
         """
         try:
-            # Generate embedding for the query
-            query_embedding = get_embedding(query_text)
-            
+            # Generate embedding for the query (memoized for repeat queries)
+            if query_embedding is None:
+                query_embedding = get_query_embedding(query_text)
+
             # Perform the query
             query_response = self.index.query(
                 vector=query_embedding,
                 top_k=top_k,
                 namespace=namespace,
-                include_metadata=include_metadata
+                include_metadata=include_metadata,
+                include_values=include_values
             )
-            
+
             # Format and return results
             results = []
             for match in query_response.get('matches', []):
@@ -215,6 +270,8 @@ class VectorStore:
                     "score": match.get('score'),
                     "metadata": match.get('metadata', {})
                 }
+                if include_values:
+                    result["values"] = match.get('values')
                 results.append(result)
             
             logger.info(f"Query returned {len(results)} results from namespace '{namespace}'")